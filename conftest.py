@@ -1,43 +1,452 @@
-import json
+import functools
+import os
+from datetime import datetime
+from urllib.parse import urlparse
 import pytest
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import WebDriverException
+from utils.browser_profiles import PROFILES as BROWSER_PROFILES
+from utils.driver_pool import DriverPool, ProfilePools, accept_disclaimer, create_driver, wait_for_chat_ready
+from utils.stand_in import StandInServer
+from utils.api_client import ChatClient
+from utils.driver_cache import DEFAULT_CACHE as DRIVER_CACHE, configure_driver_resolver, get_driver_resolver
+from utils.network_capture import CHAT_PATTERN, DEFAULT_FOLDER as CAPTURE_FOLDER, format_summary
+from utils.network_matrix import DEFAULT_BASELINE as NETWORK_BASELINE, NetworkCondition, NetworkMatrixPlugin, matrix
+from utils.registry import get_locators
+from utils.response_cache import MODES as CACHE_MODES, configure_response_cache, get_response_cache
+from utils.result_sink import configure_sink, get_sink
+from utils.result_store import DEFAULT_DB as RESULTS_DB, ingest_all
+from utils.screenshots import MODES as SCREENSHOT_MODES, configure_screenshots, get_screenshot_service
+from utils.semantic import DEFAULT_REFERENCES, DEFAULT_THRESHOLD, configure_semantic, get_semantic_scorer
+from utils.timeline import drain_timelines, format_timeline
+from utils.timeouts import DEFAULT_PATH as TIMEOUT_STATS, configure_timeout_policy, get_timeout_policy
+from utils.timing import DEFAULT_TRACE, TimingPlugin, configure_tracer, instrument_waits, span
+from utils.visual import DEFAULT_BASELINES as VISUAL_BASELINES, configure_visual, get_visual_checker
+from utils.warm_start import WarmStart
 
 
-# Load locators from JSON
-with open("data/locators.json") as f:
-    locators = json.load(f)
+# Load locators from the shared registry
+locators = get_locators()
+
+SITE_URL = "https://ask.u.ae/"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--pool-size", type=int, default=1,
+                     help="Number of browsers kept alive and shared between tests")
+    parser.addoption("--max-driver-uses", type=int, default=20,
+                     help="Recycle a pooled browser after this many tests")
+    parser.addoption("--browser-profile", choices=BROWSER_PROFILES, default="full",
+                     help="Browser profile of tests without a browser_profile marker")
+    parser.addoption("--profile-benchmark", action="store_true",
+                     help="Compare page-ready time and memory of the full and lean browser profiles")
+    parser.addoption("--profile-benchmark-runs", type=int, default=5,
+                     help="Page loads per profile in the benchmark")
+    parser.addoption("--no-warm-start", action="store_true",
+                     help="Click through the disclaimer in every session instead of reusing profile snapshots")
+    parser.addoption("--chromedriver", default=None,
+                     help="Use this ChromeDriver binary instead of resolving one")
+    parser.addoption("--driver-cache", default=DRIVER_CACHE,
+                     help="Shared ChromeDriver cache directory (pre-warm with `python -m utils.driver_cache warm`)")
+    parser.addoption("--offline-driver", action="store_true",
+                     help="Never download a ChromeDriver, fail when the cache has no match")
+    parser.addoption("--stand-in", action="store_true",
+                     help="Run against the bundled local U-Ask stand-in instead of ask.u.ae")
+    parser.addoption("--stand-in-latency", type=float, default=0.0,
+                     help="Seconds the stand-in waits before answering")
+    parser.addoption("--stand-in-cps", type=float, default=0,
+                     help="Stand-in streaming speed in characters per second (0 = instant)")
+    parser.addoption("--stand-in-failure-rate", type=float, default=0.0,
+                     help="Fraction of stand-in answers replaced by a backend failure")
+    parser.addoption("--stand-in-captcha-rate", type=float, default=0.0,
+                     help="Fraction of stand-in answers replaced by the captcha blocker")
+    parser.addoption("--console-results", action="store_true",
+                     help="Print a one-line summary per validation result")
+    parser.addoption("--screenshots", choices=SCREENSHOT_MODES, default="always",
+                     help="always, on-failure only, or ring (keep the last frames, write them on failure)")
+    parser.addoption("--screenshot-ring-size", type=int, default=5,
+                     help="Frames kept per test in ring mode")
+    parser.addoption("--response-cache", choices=CACHE_MODES, default="off",
+                     help="Record answers, replay them (browser replay needs --stand-in) or refresh stale ones")
+    parser.addoption("--response-cache-dir", default=".cache/responses")
+    parser.addoption("--response-cache-ttl", type=float, default=None,
+                     help="Hours after which refresh mode re-records an answer")
+    parser.addoption("--response-cache-size", type=int, default=5000,
+                     help="Maximum cached answers, least recently used are evicted")
+    parser.addoption("--corpus", default=None,
+                     help="JSON Lines query corpus streamed by the corpus shard tests")
+    parser.addoption("--corpus-shards", type=int, default=8,
+                     help="Number of deterministic shards the corpus is split into")
+    parser.addoption("--fuzz", action="store_true",
+                     help="Run the mutated security fuzz corpus")
+    parser.addoption("--fuzz-mode", choices=("api", "browser"), default="api",
+                     help="Ask fuzz payloads over the chat API or through pooled lean browsers")
+    parser.addoption("--fuzz-size", type=int, default=2000,
+                     help="Number of distinct payloads generated from the security seeds")
+    parser.addoption("--fuzz-seed", type=int, default=0,
+                     help="Random seed of the fuzz corpus, the same seed gives the same payloads")
+    parser.addoption("--fuzz-workers", type=int, default=4,
+                     help="Concurrent chat sessions per fuzz shard")
+    parser.addoption("--fuzz-batch", type=int, default=50,
+                     help="Payloads asked in one chat session before it is reset")
+    parser.addoption("--fuzz-shards", type=int, default=1,
+                     help="Number of deterministic shards the fuzz corpus is split into")
+    parser.addoption("--fuzz-max-error-rate", type=float, default=0.01,
+                     help="Share of fuzz payloads that may fail to get an answer (captcha, network) before the shard fails")
+    parser.addoption("--api-url", default=None,
+                     help="Chat backend root for the browserless API tests (defaults to the stand-in)")
+    parser.addoption("--no-adaptive-timeouts", action="store_true",
+                     help="Use the fixed default deadlines instead of ones learned from past runs")
+    parser.addoption("--timeout-stats", default=TIMEOUT_STATS,
+                     help="File with the rolling wait latencies per operation and language")
+    parser.addoption("--timeout-percentile", type=float, default=95,
+                     help="Latency percentile a deadline is based on")
+    parser.addoption("--timeout-factor", type=float, default=2.0,
+                     help="Safety factor applied to the percentile")
+    parser.addoption("--timeout-cap", type=float, default=90.0,
+                     help="Hard upper limit for any wait in seconds")
+    parser.addoption("--network-matrix", action="store_true",
+                     help="Run the network-condition performance matrix")
+    parser.addoption("--network-profiles", default=None,
+                     help="Comma-separated profiles: fiber,4g,3g,satellite,lossy (default all)")
+    parser.addoption("--cpu-throttling", default=None,
+                     help="Comma-separated CPU slowdown factors (default 1,4)")
+    parser.addoption("--network-baseline", default=NETWORK_BASELINE,
+                     help="Baseline medians per network condition")
+    parser.addoption("--network-margin", type=float, default=0.25,
+                     help="Fail when a median gets slower than the baseline by more than this fraction")
+    parser.addoption("--update-network-baseline", action="store_true",
+                     help="Write this run's medians to the baseline instead of comparing")
+    parser.addoption("--capture-network", action="store_true",
+                     help="Record every request of the browser through selenium-wire into a HAR-like file per test")
+    parser.addoption("--capture-dir", default=CAPTURE_FOLDER,
+                     help="Folder for the per-test network captures")
+    parser.addoption("--capture-chat-pattern", default=CHAT_PATTERN,
+                     help="Regex on the URL that marks calls to the chat backend")
+    parser.addoption("--visual-regression", action="store_true",
+                     help="Compare this run's screenshots with the baselines per test name")
+    parser.addoption("--update-visual-baselines", action="store_true",
+                     help="Replace the visual baselines with this run's screenshots")
+    parser.addoption("--visual-baselines", default=VISUAL_BASELINES)
+    parser.addoption("--visual-ssim", type=float, default=0.98,
+                     help="SSIM below which a screenshot counts as changed")
+    parser.addoption("--visual-max-pixels", type=int, default=100,
+                     help="Changed pixels (outside masks) tolerated before a screenshot counts as changed")
+    parser.addoption("--visual-workers", type=int, default=None,
+                     help="Processes comparing screenshots (default one per core)")
+    parser.addoption("--store-results", action="store_true",
+                     help="Ingest this run's results into the SQLite history (logs/results.db) at the end")
+    parser.addoption("--no-timing", action="store_true",
+                     help="Do not record per-step timing spans")
+    parser.addoption("--timing-trace", default=DEFAULT_TRACE,
+                     help="Chrome trace event file with every timing span (open in chrome://tracing or Perfetto)")
+    parser.addoption("--semantic-score", action="store_true",
+                     help="Score every answer against reference answers in one batch after the run")
+    parser.addoption("--semantic-references", action="append", default=None,
+                     help=f"Results file whose PASS answers are references, repeatable (default {DEFAULT_REFERENCES[0]})")
+    parser.addoption("--semantic-threshold", type=float, default=DEFAULT_THRESHOLD,
+                     help="Cosine similarity below which an answer is reported as LOW")
+
+
+def pytest_generate_tests(metafunc):
+    if "network_condition" in metafunc.fixturenames:
+        config = metafunc.config
+        if config.getoption("--network-matrix"):
+            profiles = config.getoption("--network-profiles")
+            rates = config.getoption("--cpu-throttling")
+            conditions = matrix(profiles.split(",") if profiles else None,
+                                [float(rate) if "." in rate else int(rate) for rate in rates.split(",")] if rates else None)
+        else:
+            conditions = [None]
+        metafunc.parametrize("network_condition", conditions,
+                             ids=[c.name if c is not None else "off" for c in conditions])
+    if "corpus_shard" in metafunc.fixturenames:
+        metafunc.parametrize("corpus_shard", range(metafunc.config.getoption("--corpus-shards")))
+    if "fuzz_shard" in metafunc.fixturenames:
+        metafunc.parametrize("fuzz_shard", range(metafunc.config.getoption("--fuzz-shards")))
+
+
+def pytest_configure(config):
+    # One id for the whole session, inherited by xdist workers, so results can be grouped per run
+    os.environ.setdefault("UASK_RUN_ID", datetime.now().strftime("%Y%m%d-%H%M%S"))
+    # Latency is only comparable on the same site; the stand-in answers in milliseconds
+    os.environ["UASK_SITE"] = "stand-in" if config.getoption("--stand-in") else urlparse(SITE_URL).hostname
+    config.addinivalue_line(
+        "markers", "browser_profile(name): run the test in the 'full' (headed, everything loaded) or "
+                   "'lean' (headless, images/media/fonts/trackers blocked) browser profile")
+    configure_driver_resolver(
+        cache_dir=config.getoption("--driver-cache"),
+        driver_path=config.getoption("--chromedriver"),
+        offline=config.getoption("--offline-driver"),
+    )
+    if config.getoption("--network-matrix"):
+        config.pluginmanager.register(NetworkMatrixPlugin(
+            config,
+            baseline_path=config.getoption("--network-baseline"),
+            margin=config.getoption("--network-margin"),
+            update=config.getoption("--update-network-baseline"),
+        ), "network-matrix")
+    if not config.getoption("--no-timing"):
+        instrument_waits()
+        tracer = configure_tracer(enabled=True)
+        config.pluginmanager.register(TimingPlugin(tracer, config.getoption("--timing-trace")), "timing")
+    if config.getoption("--console-results"):
+        configure_sink(console=True)
+    configure_screenshots(
+        mode=config.getoption("--screenshots"),
+        ring_size=config.getoption("--screenshot-ring-size"),
+    )
+    ttl_hours = config.getoption("--response-cache-ttl")
+    configure_response_cache(
+        directory=config.getoption("--response-cache-dir"),
+        mode=config.getoption("--response-cache"),
+        ttl=ttl_hours * 3600 if ttl_hours is not None else None,
+        max_entries=config.getoption("--response-cache-size"),
+        # Canned stand-in answers must never overwrite recordings of the real bot
+        live=not config.getoption("--stand-in"),
+    )
+    policy = configure_timeout_policy(
+        path=config.getoption("--timeout-stats"),
+        pct=config.getoption("--timeout-percentile"),
+        factor=config.getoption("--timeout-factor"),
+        cap=config.getoption("--timeout-cap"),
+        adaptive=not config.getoption("--no-adaptive-timeouts"),
+        site=os.environ["UASK_SITE"],
+    )
+    policy.seed_from_results("logs/validation.jsonl")
+    configure_visual(
+        baselines=config.getoption("--visual-baselines"),
+        enabled=config.getoption("--visual-regression") or config.getoption("--update-visual-baselines"),
+        update=config.getoption("--update-visual-baselines"),
+        ssim_threshold=config.getoption("--visual-ssim"),
+        max_changed_pixels=config.getoption("--visual-max-pixels"),
+        workers=config.getoption("--visual-workers"),
+    )
+    configure_semantic(
+        references=config.getoption("--semantic-references") or DEFAULT_REFERENCES,
+        threshold=config.getoption("--semantic-threshold"),
+        enabled=config.getoption("--semantic-score"),
+    )
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session, exitstatus):
+    get_screenshot_service().close()
+    checker = get_visual_checker()
+    if checker.enabled:
+        # Screenshots are all on disk now; compare them before the HTML report is written
+        checker.run()
+        if checker.changed and session.exitstatus == 0:
+            session.exitstatus = 1
+    get_sink().flush()
+    if session.config.getoption("--store-results") and not hasattr(session.config, "workerinput"):
+        session.config.stored_results = ingest_all()
+    get_response_cache().save()
+    get_semantic_scorer().finish()
+    get_timeout_policy().save()
+
+
+def pytest_runtest_setup(item):
+    get_screenshot_service().test_started()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """Remember per phase whether the test broke its browser and attach streaming timelines"""
+    outcome = yield
+    if call.excinfo is not None and call.excinfo.errisinstance(WebDriverException):
+        item.driver_broken = True
+    timelines = drain_timelines()
+    if call.when == "call":
+        outcome.get_result().timelines = timelines
+        if call.excinfo is not None:
+            get_screenshot_service().test_failed(item.funcargs.get("driver"), item.name)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_table_header(cells):
+    cells.insert(2, "<th>Streaming</th>")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_table_row(report, cells):
+    timelines = getattr(report, "timelines", [])
+    cells.insert(2, "<td>{}</td>".format("<br>".join(format_timeline(t) for t in timelines)))
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix, summary, postfix, session):
+    checker = get_visual_checker()
+    if checker.results:
+        report_path = session.config.getoption("htmlpath", None) or "."
+        postfix.append(checker.html_summary(os.path.dirname(os.path.abspath(report_path))))
+
+
+@pytest.fixture(scope="session")
+def stand_in(request):
+    """Local U-Ask stand-in server, or None when running against the live portal"""
+    if not request.config.getoption("--stand-in"):
+        yield None
+        return
+    server = StandInServer(
+        latency=request.config.getoption("--stand-in-latency"),
+        chars_per_second=request.config.getoption("--stand-in-cps"),
+        failure_rate=request.config.getoption("--stand-in-failure-rate"),
+        captcha_rate=request.config.getoption("--stand-in-captcha-rate"),
+        response_cache=get_response_cache() if get_response_cache().mode in ("replay", "refresh") else None,
+    )
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def site_url(stand_in):
+    """Root URL of the chat site, the language roots live below it"""
+    return stand_in.url if stand_in is not None else SITE_URL
+
+
+@pytest.fixture(scope="session")
+def warm_start(request, site_url):
+    """Per-language profile snapshots, or None when disabled"""
+    if request.config.getoption("--no-warm-start"):
+        return None
+    request.config.warm_start = WarmStart(site_url, locators)
+    return request.config.warm_start
+
+
+@pytest.fixture(scope="session")
+def open_chat(site_url, warm_start):
+    """Open the chat for a language on a ready input box and return the input element"""
+    def open_chat(driver, lang):
+        if warm_start is not None:
+            return warm_start.open(driver, lang)
+        with span("page load"):
+            driver.get(site_url + lang + "/")
+        accept_disclaimer(driver, locators)
+        return wait_for_chat_ready(driver, locators)
+    return open_chat
+
 
 @pytest.fixture(scope="function")
-def driver():
-    options = webdriver.ChromeOptions()
-    # options.add_argument("--headless")
-    options.add_argument("--window-size=1920,1080")
+def network_conditions(request, network_condition):
+    """
+    Emulate one network profile and CPU slowdown for the test, with deadlines lifted
+    to the cap. Request it before `driver` so a disabled matrix skips without a browser.
+    """
+    if network_condition is None:
+        pytest.skip("Network matrix needs --network-matrix")
+    driver = request.getfixturevalue("driver")
+    network_condition.apply(driver)
+    with get_timeout_policy().pause():
+        yield network_condition
+    NetworkCondition.reset(driver)
+
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+@pytest.fixture(scope="session")
+def chat_api_url(request, stand_in):
+    """Root URL of the chat backend used by the API tests"""
+    url = request.config.getoption("--api-url") or (stand_in.url if stand_in is not None else None)
+    if url is None:
+        pytest.skip("API mode needs --stand-in or --api-url")
+    return url
 
-    driver.get("https://ask.u.ae/en/")
 
-    wait = WebDriverWait(driver, 10)
+@pytest.fixture(scope="session")
+def corpus_path(request):
+    path = request.config.getoption("--corpus")
+    if path is None:
+        pytest.skip("Corpus tests need --corpus PATH")
+    return path
 
-    # Accept disclaimer
-    try:
-        accept_button = wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["home_page"]["accept_button"]))
+
+@pytest.fixture(scope="session")
+def chat_client(chat_api_url):
+    with ChatClient(chat_api_url) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def driver_pools(request, site_url, warm_start):
+    """Browser pools per profile, each launched when a test first needs it"""
+    config = request.config
+
+    def make_pool(profile):
+        capture = None
+        if config.getoption("--capture-network"):
+            capture = {
+                "folder": config.getoption("--capture-dir"),
+                "chat_pattern": config.getoption("--capture-chat-pattern"),
+            }
+        return DriverPool(
+            functools.partial(create_driver, profile=profile, capture=capture),
+            locators,
+            site_url + "en/",
+            size=config.getoption("--pool-size"),
+            max_uses=config.getoption("--max-driver-uses"),
+            warm_start=warm_start,
         )
-        accept_button.click()
-    except Exception as e:
-        print("Disclaimer button not found or already accepted:", e)
 
-    # Wait for the chat widget or input box to be ready
-    wait.until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, locators["home_page"]["chat_input_box"]))
-    )
+    pools = ProfilePools(make_pool)
+    config.driver_pools = pools
+    yield pools
+    pools.close()
+
 
-    yield driver
-    driver.quit()
\ No newline at end of file
+def browser_profile(item):
+    """Profile of a test: its browser_profile marker, else --browser-profile"""
+    marker = item.get_closest_marker("browser_profile")
+    return marker.args[0] if marker is not None else item.config.getoption("--browser-profile")
+
+
+@pytest.fixture(scope="function")
+def driver(request, driver_pools):
+    pool = driver_pools.get(browser_profile(request.node))
+    entry = pool.acquire()
+    capture = getattr(entry.driver, "network_capture", None)
+    if capture is not None:
+        capture.start(request.node.nodeid)
+    yield entry.driver
+    if capture is not None:
+        path, summary = capture.stop()
+        request.node.add_report_section("teardown", "network", f"{path}\n{format_summary(summary)}")
+        request.config.network_captures = getattr(request.config, "network_captures", 0) + 1
+    pool.release(entry, broken=getattr(request.node, "driver_broken", False))
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    pools = getattr(config, "driver_pools", None)
+    if pools is not None:
+        terminalreporter.write_line(pools.summary())
+    captures = getattr(config, "network_captures", 0)
+    if captures:
+        terminalreporter.write_line(
+            f"Network capture: {captures} tests recorded in {config.getoption('--capture-dir')}")
+    resolver = get_driver_resolver()
+    if resolver.source is not None:
+        terminalreporter.write_line(f"ChromeDriver: {resolver.resolve()} ({resolver.source})")
+    cache = get_response_cache()
+    if cache.enabled:
+        terminalreporter.write_line(cache.report())
+    policy = get_timeout_policy()
+    if policy.adaptive:
+        terminalreporter.write_line(policy.report())
+    if get_sink().errors:
+        terminalreporter.write_line(f"Result sink: {get_sink().errors} results could not be written", red=True)
+    stored = getattr(config, "stored_results", None)
+    if stored is not None:
+        terminalreporter.write_line(f"Result store: {stored} new results in {RESULTS_DB}")
+    checker = get_visual_checker()
+    if checker.enabled:
+        terminalreporter.write_line(checker.report())
+        for result in checker.changed:
+            terminalreporter.write_line(
+                f"VISUAL CHANGE {result['name']}: {result.get('reason') or result['diff']}", red=True)
+    scorer = get_semantic_scorer()
+    if scorer.enabled:
+        terminalreporter.write_line(scorer.report())
+    warm = getattr(config, "warm_start", None)
+    if warm is not None:
+        terminalreporter.write_line(
+            f"Warm start: {warm.stats['warm_starts']} warm starts, {warm.stats['bootstraps']} bootstraps, "
+            f"{warm.stats['invalidated']} snapshots invalidated"
+        )
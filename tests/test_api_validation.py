@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from utils.api_client import AsyncChatClient
+from utils.registry import iter_shard
+from utils.helpers import *
+
+
+class TestUAskApi:
+    """Response validation and security checks against the chat backend, without a browser"""
+
+    @pytest.fixture(scope="class")
+    def test_data(self):
+        return load_test_data()
+
+    @pytest.mark.parametrize("query_data", load_test_data()["response_validation"]["common_queries"])
+    @pytest.mark.parametrize("lang", ["en", "ar"])
+    def test_queries(self, chat_client, query_data, lang):
+        """Validate English and Arabic answers over the API"""
+        query = query_data[lang]
+        response = chat_client.ask(query, lang)
+
+        assert not response.captcha, "Captcha returned instead of an answer"
+        validate_response(response, lang, query_data["expected_keywords"][lang], query=query)
+
+    @pytest.mark.parametrize("xss_attempt", load_test_data()["security_tests"]["xss_attempts"])
+    def test_xss_protection(self, chat_client, test_data, xss_attempt):
+        """Test that the backend does not send script markup back in its raw answer."""
+        response = chat_client.ask(xss_attempt, "en")
+        response_html = injection_surface(response).lower()
+
+        failure_reasons = find_xss_markers(response_html, test_data["security_tests"]["xss_expected_strings"])
+
+        passed = not failure_reasons
+        log_validation_result("en", xss_attempt, response_html, passed, failure_reasons, timeline=response.timeline)
+
+        assert passed, f"XSS vulnerability detected: {', '.join(failure_reasons)}"
+
+    @pytest.mark.parametrize("malicious_prompt", load_test_data()["security_tests"]["malicious_prompts"])
+    def test_malicious_prompts(self, chat_client, test_data, malicious_prompt):
+        """Test that the backend rejects malicious prompt injections."""
+        response = chat_client.ask(malicious_prompt, "en")
+        response_text = response.text.lower()
+
+        expected_phrases = test_data["security_tests"]["expected_rejection_phrases"]
+        passed = bool(find_rejection_phrases(response_text, expected_phrases))
+        failure_reasons = [] if passed else ["No expected fallback phrase found in response"]
+
+        log_validation_result("en", malicious_prompt, response_text, passed, failure_reasons,
+                              timeline=response.timeline)
+
+        assert passed, f"Malicious prompt not properly rejected: {malicious_prompt}"
+
+    def test_corpus_shard(self, chat_client, corpus_path, corpus_shard, request):
+        """Stream one deterministic shard of a large JSONL corpus and validate every answer"""
+        shard_count = request.config.getoption("--corpus-shards")
+        failures = []
+        for item in iter_shard(corpus_path, corpus_shard, shard_count):
+            try:
+                validate_response(chat_client.ask(item.query, item.lang), item.lang,
+                                  item.expected_keywords, query=item.query)
+            except AssertionError as e:
+                failures.append(f"[{item.lang.upper()}] {item.query}: {e}")
+
+        assert not failures, f"{len(failures)} corpus queries failed:\n" + "\n".join(failures[:20])
+
+    def test_concurrent_queries(self, chat_api_url, test_data):
+        """Ask every common query in both languages concurrently over pooled connections"""
+        queries = [
+            (query_data[lang], lang)
+            for query_data in test_data["response_validation"]["common_queries"]
+            for lang in ("en", "ar")
+        ]
+
+        async def run():
+            async with AsyncChatClient(chat_api_url) as client:
+                return await client.ask_many(queries)
+
+        responses = asyncio.run(run())
+
+        assert len(responses) == len(queries)
+        for (query, lang), response in zip(queries, responses):
+            assert response.query == query and response.lang == lang
+            assert response.text and not response.captcha, f"[{lang.upper()}] No answer for: {query}"
@@ -0,0 +1,58 @@
+import json
+import os
+import statistics
+import time
+import pytest
+from utils.browser_profiles import PROFILES, format_comparison, memory_usage
+from utils.driver_pool import accept_disclaimer, create_driver, wait_for_chat_ready
+from utils.helpers import *
+
+
+def median_memory(samples):
+    """Median of every memory figure over the runs, skipping the ones a platform could not measure"""
+    medians = {}
+    for key in samples[0]:
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        medians[key] = round(statistics.median(values), 1) if values else None
+    return medians
+
+
+class TestUAskBrowserProfiles:
+    """Page-ready time and memory of the full and lean browser profiles on fresh browsers"""
+
+    @pytest.fixture(scope="class")
+    def locators(self):
+        return load_locators()
+
+    def test_lean_profile_benchmark(self, request, site_url, locators):
+        """Load the chat repeatedly in each profile; the lean one must not be slower"""
+        if not request.config.getoption("--profile-benchmark"):
+            pytest.skip("Profile benchmark needs --profile-benchmark")
+        runs = request.config.getoption("--profile-benchmark-runs")
+
+        results = {}
+        for profile in PROFILES:
+            page_ready, memory = [], []
+            for _ in range(runs):
+                # A new browser per run, so no run is served from the previous one's HTTP cache
+                driver = create_driver(profile)
+                try:
+                    driver.get("about:blank")
+                    started = time.perf_counter()
+                    driver.get(site_url + "en/")
+                    accept_disclaimer(driver, locators)
+                    wait_for_chat_ready(driver, locators)
+                    page_ready.append(time.perf_counter() - started)
+                    memory.append(memory_usage(driver))
+                finally:
+                    driver.quit()
+            results[profile] = dict(page_ready=round(statistics.median(page_ready), 3), **median_memory(memory))
+
+        os.makedirs("logs", exist_ok=True)
+        with open("logs/profile_benchmark.json", "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        request.node.add_report_section("call", "browser profiles", format_comparison(results))
+
+        assert results["lean"]["page_ready"] <= results["full"]["page_ready"] * 1.25, (
+            f"Lean profile slower than full: {results['lean']['page_ready']}s vs {results['full']['page_ready']}s"
+        )
@@ -0,0 +1,24 @@
+import pytest
+from utils.load_test import ApiSession, build_queries, format_table, run_load, summarize
+from utils.helpers import *
+
+
+class TestUAskLoad:
+    @pytest.fixture(scope="class")
+    def test_data(self):
+        return load_test_data()
+
+    def test_concurrent_load_latency(self, chat_client, test_data):
+        """Run the query set over concurrent API sessions and check the latency report"""
+        queries = build_queries(test_data, iterations=3)
+
+        results, wall_seconds = run_load(lambda: ApiSession(chat_client), queries, sessions=4, rate=50)
+        summary = summarize(results, wall_seconds)
+        print(format_table(summary))
+
+        assert len(results) == len(queries)
+        assert set(summary) == {"en", "ar", "all"}
+        for lang, stats in summary.items():
+            assert stats["error_rate"] == 0, f"[{lang.upper()}] errors during load run"
+            assert stats["time_to_first_text_p50"] <= stats["time_to_complete_p99"]
+            assert stats["throughput"] > 0
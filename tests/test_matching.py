@@ -0,0 +1,45 @@
+import pytest
+from utils.matching import KeywordMatcher, matcher_for, normalize
+
+
+class TestUAskMatching:
+    """Keyword normalization and the Aho-Corasick matcher used by the response checks"""
+
+    @pytest.mark.parametrize("keyword, response", [
+        ("رخصة قيادة", "كيف أحصل على رخصة القيادة؟"),      # definite article
+        ("رخصة القيادة", "تجديد رخصة قيادة"),
+        ("رخصة", "رُخْصَةُ السياقة"),                        # tashkeel
+        ("قيادة", "القيـــادة الآمنة"),                      # tatweel
+        ("الإمارات", "دولة الامارات العربية المتحدة"),       # alef with hamza below
+        ("أبوظبي", "ابوظبي"),                               # alef with hamza above
+        ("مستشفى", "المستشفي"),                             # alef maksura
+        ("وزارة الصحة", "وزاره الصحه"),                     # taa marbuta
+    ])
+    def test_arabic_variants_match(self, keyword, response):
+        assert matcher_for([keyword], "ar").find(response) == [keyword]
+
+    def test_arabic_normalization_folds_variants(self):
+        assert normalize("رخصة قيادة", "ar") == normalize("رخصة القيادة", "ar") == normalize("رُخْصَةُ القِيـادة", "ar")
+
+    def test_short_words_keep_their_article_letters(self):
+        # "ال" is only stripped when at least two letters remain
+        assert normalize("الم", "ar") == "الم"
+
+    def test_english_ignores_case_and_punctuation(self):
+        matcher = matcher_for(["driving license", "Emirates ID"], "en")
+        assert matcher.find("How do I renew my Driving-License and EMIRATES   ID?") == ["driving license", "Emirates ID"]
+
+    def test_overlapping_keywords_in_one_pass(self):
+        assert KeywordMatcher(["he", "she", "his", "hers"]).find("ushers") == ["he", "she", "hers"]
+
+    def test_missing_keeps_keyword_order(self):
+        matcher = KeywordMatcher(["visa", "passport", "permit"])
+        assert matcher.missing("Your passport is ready") == ["visa", "permit"]
+
+    def test_raw_mode_only_case_folds(self):
+        matcher = matcher_for(["<script>", "onerror"], "raw")
+        assert matcher.find("<SCRIPT>alert(1)</script>") == ["<script>"]
+        assert matcher.find("&lt;script&gt; on error") == []
+
+    def test_matchers_are_compiled_once(self):
+        assert matcher_for(["visa"], "en") is matcher_for(("visa",), "en")
@@ -0,0 +1,38 @@
+import time
+import pytest
+from utils.network_matrix import record_sample
+from utils.helpers import *
+
+
+class TestUAskNetworkMatrix:
+    """Response-validation queries replayed under emulated network profiles and CPU throttling"""
+
+    @pytest.fixture(scope="class")
+    def locators(self):
+        return load_locators()
+
+    @pytest.mark.parametrize("query_data", load_test_data()["response_validation"]["common_queries"])
+    @pytest.mark.parametrize("lang", ["en", "ar"])
+    def test_query_under_network_condition(self, network_conditions, driver, locators, open_chat, query_data, lang):
+        """Record load-to-interactive, time-to-spinner and time-to-complete for one query"""
+        query = query_data[lang]
+
+        started = time.perf_counter()
+        input_field = open_chat(driver, lang)
+        load_to_interactive = time.perf_counter() - started
+
+        previous = current_response(driver, locators, lang)
+        insert_text(driver, input_field, query)
+        start_response_probe(driver, locators, lang, previous)
+        input_field.send_keys(Keys.ENTER)
+        response = wait_for_response(driver, locators, lang, previous=previous)
+        probe = collect_response_probe(driver)
+
+        record_sample(
+            network_conditions, lang, query,
+            load_to_interactive=load_to_interactive,
+            time_to_spinner=probe.get("time_to_spinner"),
+            time_to_complete=probe.get("time_to_complete"),
+        )
+
+        assert response.text.strip(), f"[{network_conditions.name}] No answer for: {query}"
@@ -1,10 +1,9 @@
 import pytest
-import time
-from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from utils.helpers import *
 
+@pytest.mark.browser_profile("lean")
 class TestUAskMultilingual:
     @pytest.fixture(scope="class")
     def locators(self):
@@ -25,95 +24,45 @@ class TestUAskMultilingual:
     def send_english_query(self, driver, locators, query, input_field):
         """Improved version that can accept pre-found input field"""
         if input_field is None:
-            input_field = WebDriverWait(driver, 20).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, locators["chat_widget"]["input_field"]))
+            input_field = wait_until(
+                driver, locators, "input",
+                EC.element_to_be_clickable((By.CSS_SELECTOR, locators["chat_widget"]["input_field"])),
+                "en",
             )
         #input_field.clear()
-        input_field.send_keys(query + Keys.ENTER)
-        return self.get_ai_response(driver, locators,query, "en")
+        previous = current_response(driver, locators, "en")
+        input_field.send_keys(query)
+        start_response_probe(driver, locators, "en", previous)
+        input_field.send_keys(Keys.ENTER)
+        return self.get_ai_response(driver, locators, query, "en", previous)
 
     def send_arabic_query(self, driver, locators, query):
         """Handle Arabic query submission with special handling"""
-        input_field = WebDriverWait(driver, 20).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["chat_widget"]["input_field"]))
+        input_field = wait_until(
+            driver, locators, "input",
+            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["chat_widget"]["input_field"])),
+            "ar",
         )
-        driver.execute_script("arguments[0].value = '';", input_field)
-        time.sleep(0.5)
-        
-        actions = ActionChains(driver)
-        actions.move_to_element(input_field).click()
-        for char in query:
-            actions.send_keys(char)
-            time.sleep(0.1)
-        actions.perform()
-        time.sleep(0.5)
+        previous = current_response(driver, locators, "ar")
+        insert_text(driver, input_field, query)
+        start_response_probe(driver, locators, "ar", previous)
         input_field.send_keys(Keys.ENTER)
-        return self.get_ai_response(driver, locators, query, "ar")
+        return self.get_ai_response(driver, locators, query, "ar", previous)
 
-    def get_ai_response(self, driver, locators, query, lang):
-        """Wait for AI response using appropriate locator based on language"""
-        selector_key = "ai_message_rtl" if lang == "ar" else "ai_message"
-
-        ai_element = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, locators["chat_widget"][selector_key]))
-        )
+    def get_ai_response(self, driver, locators, query, lang, previous=None):
+        """Wait for the AI response to finish streaming, using the locator for the language"""
+        ai_element = wait_for_response(driver, locators, lang, previous=previous)
+        collect_timeline(driver, ai_element)
+        cache_response(query, lang, ai_element)
         
-        # Save screenshot immediately after response appears
+        # Save screenshot immediately after response completes
         safe_query = query.replace(" ", "_").replace("؟", "").replace("?", "")
         test_name = f"ai_response_{lang}_{safe_query}"
-        save_screenshot(driver, test_name)
+        # validate_response logs the path with the result
+        ai_element.screenshot_path = save_screenshot(driver, test_name)
         
         return ai_element
 
-    def validate_response(self, response, lang, expected_keywords, query=""):
-        """Validate response content with logging"""
-        response_text = response.text.strip()
-        validation_passed = True
-        failure_reasons = []
-        
-        try:
-            assert len(response_text) > 20, "Response too short"
-            assert not response_text.endswith("..."), "Incomplete response"
-            #assert not any(tag in response_text for tag in ["<div", "<script", "</"]), "Broken HTML"
-            
-            if lang == "en":
-                normalized_text = response_text.lower()
-                for keyword in expected_keywords:
-                    if keyword.lower() not in normalized_text:
-                        failure_reasons.append(f"Missing English keyword: {keyword}")
-                        validation_passed = False
-
-            elif lang == "ar":
-                for keyword in expected_keywords:
-                    if keyword not in response_text:
-                        failure_reasons.append(f"Missing Arabic keyword: {keyword}")
-                        validation_passed = False
-                if not any(char in response_text for char in ["ء", "آ", "أ"]):
-                    failure_reasons.append("No characteristic Arabic letters found")
-                    validation_passed = False
-
-            log_validation_result(
-                lang=lang,
-                query=query,
-                response_text=response_text,
-                passed=validation_passed,
-                failure_reasons=failure_reasons if not validation_passed else None
-            )
-
-            if not validation_passed:
-                raise AssertionError(f"Validation failed: {', '.join(failure_reasons)}")
-
-        except Exception as e:
-            log_validation_result(
-                lang=lang,
-                query=query,
-                response_text=response_text,
-                passed=False,
-                failure_reasons=[str(e)]
-            )
-            raise
-
-
    
     @pytest.mark.parametrize("query_data", load_test_data()["response_validation"]["common_queries"])
     def test_english_queries(self, driver, locators, query_data):
@@ -124,25 +73,19 @@ class TestUAskMultilingual:
         response = self.send_english_query(driver, locators, query, input_field)
         
         #Pass the query to the validation method
-        self.validate_response(response, "en", query_data["expected_keywords"]["en"], query=query)
+        validate_response(response, "en", query_data["expected_keywords"]["en"], query=query)
 
 
     @pytest.mark.parametrize("query_data", load_test_data()["response_validation"]["common_queries"])
-    def test_arabic_queries(self, driver, locators, query_data):
+    def test_arabic_queries(self, driver, locators, open_chat, query_data):
         """Test Arabic queries using existing session from conftest"""
-        driver.get("https://ask.u.ae/ar/")
-        wait = WebDriverWait(driver, 10)
-
-        accept_button = wait.until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["home_page"]["accept_button"]))
-        )
-        accept_button.click()
+        open_chat(driver, "ar")
 
         query = query_data["ar"]  #Extract Arabic query
         response = self.send_arabic_query(driver, locators, query)
         
         #Pass query into validation
-        self.validate_response(response, "ar", query_data["expected_keywords"]["ar"], query=query)
+        validate_response(response, "ar", query_data["expected_keywords"]["ar"], query=query)
 
 
 
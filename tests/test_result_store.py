@@ -0,0 +1,102 @@
+import json
+import os
+import pytest
+from utils.result_sink import render_legacy
+from utils.result_store import ResultStore
+from utils.timeline import timeline_metrics
+
+
+def record(query, status="PASS", timestamp="2026-10-01 10:00:00", run="run-a", lang="en"):
+    return {"timestamp": timestamp, "run": run, "test": "tests/test_x.py::test_x", "lang": lang, "query": query,
+            "status": status, "failure_reasons": [] if status == "PASS" else ["missing keyword"],
+            "response": f"answer to {query}", "timeline": timeline_metrics([(0.5, 10), (2.0, 40)], source="browser"),
+            "screenshot": None}
+
+
+def append(path, *records, partial=""):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(r) + "\n" for r in records)
+        f.write(partial)
+
+
+class TestUAskResultStore:
+    """Incremental, resumable ingestion of result files into the SQLite history"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = ResultStore(str(tmp_path / "results.db"))
+        yield store
+        store.close()
+
+    @pytest.fixture
+    def source(self, tmp_path):
+        return str(tmp_path / "validation.jsonl")
+
+    def count(self, store):
+        return store.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def test_reingest_reads_only_new_entries(self, store, source):
+        append(source, record("q1"), record("q2"))
+        assert store.ingest(source) == 2
+        assert store.ingest(source) == 0
+        append(source, record("q3"))
+        assert store.ingest(source) == 1
+        assert self.count(store) == 3
+
+    def test_partial_last_line_waits_for_its_newline(self, store, source):
+        line = json.dumps(record("q2")) + "\n"
+        append(source, record("q1"), partial=line[:20])
+        assert store.ingest(source) == 1
+        append(source, partial=line[20:])
+        assert store.ingest(source) == 1
+        assert [row["query"] for row in store.db.execute("SELECT query FROM results ORDER BY id")] == ["q1", "q2"]
+
+    def test_interrupted_ingestion_resumes_without_duplicates(self, store, source, monkeypatch):
+        append(source, *(record(f"q{i}") for i in range(5)))
+        original = ResultStore._row
+        calls = []
+
+        def failing_row(self, state, offset, entry):
+            calls.append(offset)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return original(self, state, offset, entry)
+
+        monkeypatch.setattr(ResultStore, "_row", failing_row)
+        with pytest.raises(KeyboardInterrupt):
+            store.ingest(source, batch_size=2)
+        monkeypatch.setattr(ResultStore, "_row", original)
+
+        assert self.count(store) == 2
+        assert store.ingest(source) == 3
+        assert self.count(store) == 5
+
+    def test_rotation_finishes_the_old_file_first(self, store, source):
+        append(source, record("q1"), record("q2"))
+        assert store.ingest(source) == 2
+        append(source, record("q3"))
+        os.replace(source, f"{source}.1")
+        append(source, record("q4"))
+        assert store.ingest(source) == 2
+        assert store.ingest(source) == 0
+        assert sorted(row["query"] for row in store.db.execute("SELECT query FROM results")) == ["q1", "q2", "q3", "q4"]
+
+    def test_rotated_file_at_same_offsets_is_not_ignored(self, store, source):
+        append(source, record("q1"))
+        assert store.ingest(source) == 1
+        os.replace(source, f"{source}.1")
+        append(source, record("q2"))
+        assert store.ingest(source) == 1
+        assert self.count(store) == 2
+
+    def test_legacy_log_and_runs_without_id(self, store, tmp_path):
+        legacy = str(tmp_path / "validation.log")
+        with open(legacy, "w", encoding="utf-8") as f:
+            f.write(render_legacy(record("q1", run=None, timestamp="2026-10-01 10:00:00")))
+            f.write(render_legacy(record("q2", status="FAIL", run=None, timestamp="2026-10-01 10:05:00")))
+            f.write(render_legacy(record("q3", run=None, timestamp="2026-10-01 14:00:00")))
+        assert store.ingest(legacy) == 3
+        assert store.ingest(legacy) == 0
+        runs = store.runs()
+        assert [run["results"] for run in runs] == [2, 1]
+        assert runs[0]["passed"] == 1
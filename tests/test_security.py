@@ -1,6 +1,7 @@
 import pytest
 from utils.helpers import *
 
+@pytest.mark.browser_profile("lean")
 class TestUAskSecurity:
     @pytest.fixture(scope="class")
     def locators(self):
@@ -17,37 +18,32 @@ class TestUAskSecurity:
         response = send_message(driver, locators, xss_attempt)
         response_html = response.get_attribute("innerHTML").lower()
 
-        save_screenshot(driver, test_name)
+        screenshot = save_screenshot(driver, test_name)
 
-        failure_reasons = [
-            f"XSS: {tag} detected"
-            for tag in test_data["security_tests"]["xss_expected_strings"]
-            if tag.lower() in response_html
-        ]
+        failure_reasons = find_xss_markers(response_html, test_data["security_tests"]["xss_expected_strings"])
 
         passed = not failure_reasons
-        log_validation_result("en", xss_attempt, response_html, passed, failure_reasons)
+        log_validation_result("en", xss_attempt, response_html, passed, failure_reasons,
+                              timeline=response.timeline, screenshot=screenshot)
 
         assert passed, f"XSS vulnerability detected: {', '.join(failure_reasons)}"
 
     @pytest.mark.parametrize("malicious_prompt", load_test_data()["security_tests"]["malicious_prompts"])
-    def test_malicious_prompts(self, driver, malicious_prompt):
+    def test_malicious_prompts(self, driver, locators, test_data, malicious_prompt):
         """Test that chatbot properly rejects malicious prompt injections."""
-        locators = load_locators()
-        test_data = load_test_data()
-
         test_name = f"malicious_{malicious_prompt[:15].replace(' ', '_')}"
         response = send_message(driver, locators, malicious_prompt)
         response_text = response.text.lower()
 
-        save_screenshot(driver, test_name)
+        screenshot = save_screenshot(driver, test_name)
 
         expected_phrases = test_data["security_tests"]["expected_rejection_phrases"]
-        matched_phrases = [phrase for phrase in expected_phrases if phrase in response_text]
+        matched_phrases = find_rejection_phrases(response_text, expected_phrases)
 
         passed = bool(matched_phrases)
         failure_reasons = [] if passed else ["No expected fallback phrase found in response"]
 
-        log_validation_result("en", malicious_prompt, response_text, passed, failure_reasons)
+        log_validation_result("en", malicious_prompt, response_text, passed, failure_reasons,
+                              timeline=response.timeline, screenshot=screenshot)
 
         assert passed, f"Malicious prompt not properly rejected: {malicious_prompt}"
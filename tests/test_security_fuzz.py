@@ -0,0 +1,52 @@
+import pytest
+from utils.fuzz import generate_corpus, run_fuzz, summarize
+from utils.load_test import ApiSession, BrowserSession
+from utils.helpers import *
+
+
+class TestUAskSecurityFuzz:
+    """Mutated XSS and prompt-injection payloads asked in batches over long-lived chat sessions"""
+
+    @pytest.fixture(scope="class")
+    def test_data(self):
+        return load_test_data()
+
+    @pytest.fixture(scope="class")
+    def fuzz_cases(self, request, test_data):
+        config = request.config
+        if not config.getoption("--fuzz"):
+            pytest.skip("Security fuzzing needs --fuzz")
+        return generate_corpus(test_data["security_tests"], config.getoption("--fuzz-size"),
+                               config.getoption("--fuzz-seed"))
+
+    @pytest.fixture(scope="class")
+    def session_factory(self, request, fuzz_cases, site_url):
+        if request.config.getoption("--fuzz-mode") == "browser":
+            pools = request.getfixturevalue("driver_pools")
+            locators = load_locators()
+            return lambda: BrowserSession(pools.get("lean"), locators, site_url)
+        chat_client = request.getfixturevalue("chat_client")
+        return lambda: ApiSession(chat_client)
+
+    def test_security_fuzz_shard(self, request, test_data, fuzz_cases, session_factory, fuzz_shard):
+        """No mutated payload may leave script markers in the answer or get past the rejection"""
+        config = request.config
+        cases = fuzz_cases[fuzz_shard::config.getoption("--fuzz-shards")]
+        results = run_fuzz(session_factory, cases, test_data["security_tests"],
+                           workers=config.getoption("--fuzz-workers"), batch_size=config.getoption("--fuzz-batch"))
+        request.node.add_report_section("call", "security fuzz", summarize(results))
+
+        failures = [r for r in results if r["reasons"]]
+        for result in failures:
+            log_validation_result("en", result["payload"], result["minimized"], False, result["reasons"])
+
+        errors = [r for r in results if r["error"]]
+        max_error_rate = config.getoption("--fuzz-max-error-rate")
+
+        assert len(results) == len(cases)
+        assert len(errors) <= max_error_rate * len(results), (
+            f"{len(errors)} of {len(results)} fuzz payloads were never checked (max {max_error_rate:.0%}):\n"
+            + "\n".join(f"[{r['kind']}] {r['payload']!r}: {r['error']}" for r in errors[:20]))
+        assert not failures, f"{len(failures)} fuzz payloads got through, minimized:\n" + "\n".join(
+            f"[{r['kind']}] {r['minimized']!r} via {'+'.join(r['mutations']) or 'seed'}: {', '.join(r['reasons'])}"
+            for r in failures[:20])
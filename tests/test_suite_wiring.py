@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+
+# Every opt-in switch, so tests that normally skip are planned with their real fixtures
+OPT_IN = ["--stand-in", "--network-matrix", "--fuzz", "--profile-benchmark", "--corpus", "data/test-data.json"]
+
+
+class TestUAskSuiteWiring:
+    """Fixture wiring of the whole suite, including the opt-in tests a plain run skips"""
+
+    def test_every_test_resolves_its_fixtures(self):
+        """A --setup-plan run with every opt-in enabled must not hit a missing fixture"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "--setup-plan", "-p", "no:cacheprovider",
+             f"--ignore={os.path.relpath(__file__, root)}", *OPT_IN, "tests"],
+            cwd=root, capture_output=True, text=True, timeout=300,
+        )
+        assert result.returncode == 0, result.stdout[-3000:] + result.stderr[-3000:]
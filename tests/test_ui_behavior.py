@@ -1,5 +1,4 @@
 import pytest
-import time
 from selenium.webdriver.chrome.webdriver import WebDriver
 from utils.helpers import *
 
@@ -20,11 +19,10 @@ class TestUAskUIBehavior:
         assert widget.is_displayed(), "Chat widget did not load correctly."
         
 
-    def test_02_user_can_send_message(self, driver: WebDriver, locators: EC.Any):
+    def test_02_user_can_send_message(self, driver: WebDriver, locators: EC.Any, test_data):
         wait = WebDriverWait(driver, 10)
 
         # Load test message from JSON
-        test_data = load_test_data()
         test_msg = test_data["ui_tests"]["test_messages"]["input_field_test"]["message"]
 
         # Step 1: Send message
@@ -43,23 +41,21 @@ class TestUAskUIBehavior:
         save_screenshot(driver, "user_can_send_message")
     
 
-    def test_03_ai_response_rendered(self, driver: WebDriver, locators: EC.Any):
+    def test_03_ai_response_rendered(self, driver: WebDriver, locators: EC.Any, test_data):
 
         # Step 1: Load English version of chat and get input box
         input_box = setup_chat(driver, locators, "en")
 
         # Step 2: Load test message from JSON
-        test_data = load_test_data()
         test_msg = test_data["ui_tests"]["test_messages"]["input_field_test"]["message"]
         test_msg_response = test_data["ui_tests"]["test_messages"]["input_field_test"]["expected_keyword"]
 
         # Step 3: Send the message to the chatbot
+        previous = current_response(driver, locators, "en")
         input_box.send_keys(test_msg + Keys.ENTER)
 
-        # Step 4: Wait for the AI response element to appear
-        ai_response = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, locators["chat_widget"]["ai_message"]))
-        )
+        # Step 4: Wait for the AI response to finish streaming
+        ai_response = wait_for_response(driver, locators, "en", previous=previous)
 
         # Step 5: Save screenshot for visual verification
         save_screenshot(driver, "ai_response_rendered")
@@ -92,7 +88,7 @@ class TestUAskUIBehavior:
 
         # Step 3: Screenshot & Logging
         test_name = f"multilingual_direction_{language}"
-        save_screenshot(driver, test_name)
+        screenshot = save_screenshot(driver, test_name)
 
         passed = actual_direction == expected_direction
         log_validation_result(
@@ -100,7 +96,8 @@ class TestUAskUIBehavior:
             query="N/A",
             response_text=f"Detected direction: {actual_direction}",
             passed=passed,
-            failure_reasons=[f"Expected: {expected_direction}, Found: {actual_direction}"] if not passed else None
+            failure_reasons=[f"Expected: {expected_direction}, Found: {actual_direction}"] if not passed else None,
+            screenshot=screenshot
         )
 
         # Step 4: Assertion
@@ -113,10 +110,10 @@ class TestUAskUIBehavior:
         # Step 1: Load English version of chat and get input box
         input_box = setup_chat(driver, locators, "en")
 
-        # Step 1: Send message
-
+        # Step 2: Send message and wait until the answer is complete
+        previous = current_response(driver, locators, "en")
         input_box.send_keys("How to renew Emirates ID?" + Keys.ENTER)
-        time.sleep(5)  # Wait for the message to be sent
+        wait_for_response(driver, locators, "en", previous=previous)
         # Step 3: Wait for input field to appear on chat screen
         input_field = WebDriverWait(driver,30).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, locators["chat_widget"]["input_field"]))
@@ -142,8 +139,9 @@ class TestUAskUIBehavior:
 
         # Step 2: Send a message to generate AI response
         test_msg = "How to renew Emirates ID?"
+        previous = current_response(driver, locators, "en")
         input_box.send_keys(test_msg + Keys.ENTER)
-        time.sleep(10)  # Let AI response render 
+        wait_for_response(driver, locators, "en", previous=previous)
 
         # Step 3: Locate the scrollable message container
         container = wait.until(
@@ -152,7 +150,6 @@ class TestUAskUIBehavior:
 
         # Step 4: Scroll to the top of the container
         driver.execute_script("arguments[0].scrollTop = 0", container)
-        time.sleep(1)  # Let it settle
 
         # Step 5: Capture current scroll position
         scroll_position = driver.execute_script("return arguments[0].scrollTop", container)
@@ -0,0 +1,207 @@
+import asyncio
+import html
+import json
+import time
+import httpx
+from utils.response_cache import CHECKED_HEADER, get_response_cache
+from utils.timeline import record_timeline, timeline_metrics
+from utils.timing import timed
+
+
+CHAT_PATH = "api/chat"
+
+
+class ChatResponse:
+    """
+    Answer returned by the chat backend. Exposes `text` and
+    `get_attribute("innerHTML")` like the bot bubble element, so the same
+    validation helpers work for browser and API mode.
+    """
+
+    def __init__(self, query, lang, text, captcha=False, failed=False,
+                 first_chunk_seconds=None, elapsed=0.0, events=None, replayed=False):
+        self.query = query
+        self.lang = lang
+        self.text = text
+        self.captcha = captcha
+        self.failed = failed
+        self.first_chunk_seconds = first_chunk_seconds
+        self.elapsed = elapsed
+        self.events = events or []
+        self.replayed = replayed
+        self.timeline = None
+
+    @property
+    def html(self):
+        # The page renders answers with textContent, so innerHTML is the escaped text
+        return html.escape(self.text, quote=False)
+
+    @property
+    def payload(self):
+        """The answer exactly as the backend sent it, before any page rendering; what XSS checks inspect"""
+        return self.text
+
+    def get_attribute(self, name):
+        if name == "innerHTML":
+            return self.html
+        if name in ("textContent", "innerText"):
+            return self.text
+        return None
+
+
+class _ResponseBuilder:
+    """Accumulates NDJSON stream events into a ChatResponse"""
+
+    def __init__(self, query, lang):
+        self.query = query
+        self.lang = lang
+        self.started = time.perf_counter()
+        self.first_chunk = None
+        self.parts = []
+        self.events = []
+        self.captcha = False
+        self.failed = False
+
+    def feed(self, line):
+        if not line:
+            return
+        event = json.loads(line)
+        now = time.perf_counter() - self.started
+        if event.get("captcha"):
+            self.captcha = True
+        elif "error" in event:
+            self.failed = True
+            self.parts.append(event["error"])
+        elif "delta" in event:
+            self.parts.append(event["delta"])
+        else:
+            return
+        if self.first_chunk is None:
+            self.first_chunk = now
+        self.events.append((now, len("".join(self.parts))))
+
+    def build(self):
+        response = ChatResponse(
+            self.query,
+            self.lang,
+            "".join(self.parts).strip(),
+            captcha=self.captcha,
+            failed=self.failed,
+            first_chunk_seconds=self.first_chunk,
+            elapsed=time.perf_counter() - self.started,
+            events=self.events,
+        )
+        return _finish(response)
+
+    def replay(self, entry):
+        """Build the response from a response-cache entry without touching the network"""
+        events = [tuple(event) for event in entry["events"]]
+        response = ChatResponse(
+            self.query,
+            self.lang,
+            entry["text"],
+            first_chunk_seconds=events[0][0] if events else None,
+            elapsed=time.perf_counter() - self.started,
+            events=events,
+            replayed=True,
+        )
+        return _finish(response)
+
+
+def _finish(response):
+    response.timeline = timeline_metrics(response.events, source="api")
+    record_timeline(response.timeline)
+    return response
+
+
+def _remember(cache, response):
+    if not response.captcha and not response.failed and not response.replayed:
+        cache.store(response.query, response.lang, response.text, response.html,
+                    response.events, response.elapsed)
+
+
+def _headers(cache):
+    # A miss was already counted here; the stand-in must not look the query up again
+    return {CHECKED_HEADER: "1"} if cache.enabled else {}
+
+
+def _limits(max_connections):
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+class ChatClient:
+    """Synchronous client for the chat backend's streaming protocol, with a pooled connection set"""
+
+    def __init__(self, base_url, timeout=60.0, max_connections=10, http2=False, cache=None):
+        self.client = httpx.Client(
+            base_url=base_url, timeout=timeout, limits=_limits(max_connections), http2=http2
+        )
+        self.cache = cache if cache is not None else get_response_cache()
+
+    @timed("api request")
+    def ask(self, message: str, lang="en"):
+        builder = _ResponseBuilder(message, lang)
+        entry = self.cache.lookup(message, lang)
+        if entry is not None:
+            return builder.replay(entry)
+        with self.client.stream("POST", CHAT_PATH, json={"message": message, "lang": lang},
+                                headers=_headers(self.cache)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                builder.feed(line)
+        result = builder.build()
+        _remember(self.cache, result)
+        return result
+
+    def close(self):
+        self.client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncChatClient:
+    """Asynchronous variant of ChatClient for running many queries concurrently"""
+
+    def __init__(self, base_url, timeout=60.0, max_connections=20, http2=False, cache=None):
+        self.client = httpx.AsyncClient(
+            base_url=base_url, timeout=timeout, limits=_limits(max_connections), http2=http2
+        )
+        self.max_connections = max_connections
+        self.cache = cache if cache is not None else get_response_cache()
+
+    async def ask(self, message: str, lang="en"):
+        builder = _ResponseBuilder(message, lang)
+        entry = self.cache.lookup(message, lang)
+        if entry is not None:
+            return builder.replay(entry)
+        async with self.client.stream("POST", CHAT_PATH, json={"message": message, "lang": lang},
+                                      headers=_headers(self.cache)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                builder.feed(line)
+        result = builder.build()
+        _remember(self.cache, result)
+        return result
+
+    async def ask_many(self, queries, concurrency=None):
+        """Ask (message, lang) pairs concurrently and return responses in input order"""
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def ask_one(message, lang):
+            async with semaphore:
+                return await self.ask(message, lang)
+
+        return await asyncio.gather(*(ask_one(message, lang) for message, lang in queries))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
@@ -0,0 +1,93 @@
+import os
+from selenium import webdriver
+
+
+PROFILES = ("full", "lean")
+
+# Network.setBlockedURLs patterns ("*" is the only wildcard) for the lean profile
+BLOCKED_URLS = [
+    # images
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    # media
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m3u8",
+    # fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # trackers and analytics
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*",
+    "*clarity.ms*", "*connect.facebook.net*", "*analytics.tiktok.com*", "*snap.licdn.com*",
+]
+
+LEAN_ARGUMENTS = [
+    "--headless=new",
+    "--disable-extensions",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+
+def chrome_options(profile="full"):
+    """ChromeOptions for a browser profile: the headed default, or headless without the extras"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown browser profile: {profile}")
+    options = webdriver.ChromeOptions()
+    # options.add_argument("--headless")
+    options.add_argument("--window-size=1920,1080")
+    if profile == "lean":
+        for argument in LEAN_ARGUMENTS:
+            options.add_argument(argument)
+    return options
+
+
+def block_resources(driver, patterns=BLOCKED_URLS):
+    """Fail matching requests inside the browser before they reach the network"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+
+def _process_tree_rss(pid):
+    """Resident memory in bytes of a process and its descendants, None where /proc is missing"""
+    if not os.path.isdir("/proc"):
+        return None
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children", encoding="utf-8") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def memory_usage(driver):
+    """JS heap and DOM size of the page plus resident memory of the whole browser (Linux only)"""
+    driver.execute_cdp_cmd("Performance.enable", {})
+    metrics = {m["name"]: m["value"] for m in driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]}
+    rss = _process_tree_rss(driver.service.process.pid)
+    return {
+        "js_heap_mb": round(metrics.get("JSHeapUsedSize", 0) / 2 ** 20, 1),
+        "dom_nodes": int(metrics.get("Nodes", 0)),
+        "browser_rss_mb": round(rss / 2 ** 20, 1) if rss is not None else None,
+    }
+
+
+def format_comparison(results):
+    """Side-by-side table of the benchmark results per profile"""
+    columns = ("page_ready", "js_heap_mb", "dom_nodes", "browser_rss_mb")
+    lines = [f"{'profile':<8}" + "".join(f"{column:>16}" for column in columns)]
+    for profile, values in results.items():
+        lines.append(f"{profile:<8}" + "".join(
+            f"{'-' if values.get(column) is None else values[column]:>16}" for column in columns))
+    return "\n".join(lines)
@@ -0,0 +1,228 @@
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from webdriver_manager.chrome import ChromeDriverManager
+from utils.result_sink import file_lock
+
+
+DEFAULT_CACHE = os.environ.get("UASK_DRIVER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "uask", "chromedriver"))
+DRIVER_NAME = "chromedriver.exe" if sys.platform == "win32" else "chromedriver"
+VERSION = re.compile(r"\d+\.\d+\.\d+\.\d+")
+
+if sys.platform == "win32":
+    CHROME_CANDIDATES = [
+        os.path.join(os.environ.get(root, ""), "Google", "Chrome", "Application", "chrome.exe")
+        for root in ("PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA")
+    ]
+elif sys.platform == "darwin":
+    CHROME_CANDIDATES = ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"]
+else:
+    CHROME_CANDIDATES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser",
+                         "/opt/google/chrome/chrome"]
+
+
+class DriverResolutionError(RuntimeError):
+    """No matching ChromeDriver in the cache and downloading is not allowed"""
+
+
+def find_chrome(binary=None):
+    """Path of the installed Chrome, from CHROME_BINARY or the usual install locations"""
+    for candidate in [binary or os.environ.get("CHROME_BINARY")] + CHROME_CANDIDATES:
+        if not candidate:
+            continue
+        path = candidate if os.path.isabs(candidate) else shutil.which(candidate)
+        if path and os.path.isfile(path):
+            return os.path.realpath(path)
+    raise DriverResolutionError("Chrome not found, set CHROME_BINARY")
+
+
+def chrome_version(chrome):
+    """Full version of a local Chrome binary, without any network access"""
+    if sys.platform == "win32":
+        # chrome.exe has no --version output; the install keeps one folder per version
+        versions = [name for name in os.listdir(os.path.dirname(chrome)) if VERSION.fullmatch(name)]
+        if versions:
+            return max(versions, key=lambda v: tuple(map(int, v.split("."))))
+        raise DriverResolutionError(f"Cannot read the Chrome version next to {chrome}")
+    output = subprocess.run([chrome, "--version"], capture_output=True, text=True, timeout=30).stdout
+    match = VERSION.search(output)
+    if not match:
+        raise DriverResolutionError(f"Cannot read the Chrome version from: {output.strip()!r}")
+    return match.group(0)
+
+
+def fingerprint(chrome):
+    """Identity of a Chrome install from a single stat; changes when Chrome is updated"""
+    stat = os.stat(chrome)
+    return hashlib.sha1(f"{chrome}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8")).hexdigest()[:16]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _link(source, target):
+    """Hard-link (or copy) a cached driver to another name in the cache"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, target)
+
+
+class DriverCache:
+    """
+    Content-addressed ChromeDriver cache shared by every worker on a machine:
+      blobs/<sha256>/chromedriver        the binaries, stored once
+      versions/<chrome major>/chromedriver   newest driver for a Chrome major version
+      installs/<fingerprint>/chromedriver    driver for one exact Chrome install
+    A known Chrome install resolves with one stat of its binary and one of its
+    driver. Everything that writes holds the cache lock file.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE):
+        self.directory = directory
+
+    def _path(self, *parts):
+        return os.path.join(self.directory, *parts, DRIVER_NAME)
+
+    def install_path(self, chrome):
+        return self._path("installs", fingerprint(chrome))
+
+    def version_path(self, version):
+        return self._path("versions", version.split(".")[0])
+
+    def lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return file_lock(os.path.join(self.directory, ".lock"))
+
+    def add(self, driver, version, chrome=None):
+        """Store a driver binary for a Chrome version (and install); caller holds the lock"""
+        blob = self._path("blobs", _sha256(driver))
+        if not os.path.exists(blob):
+            _link(driver, blob)
+            os.chmod(blob, 0o755)
+        _link(blob, self.version_path(version))
+        if chrome is not None:
+            _link(blob, self.install_path(chrome))
+        return blob
+
+
+class DriverResolver:
+    """
+    Finds the ChromeDriver for the local Chrome: an explicit path, then the
+    fingerprint of the installed Chrome in the cache, then a cached driver for its
+    major version, and only then a download through webdriver-manager (unless
+    offline). The result is kept for the rest of the process.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE, driver_path=None, chrome_binary=None, offline=False):
+        self.cache = DriverCache(cache_dir)
+        self.driver_path = driver_path or os.environ.get("UASK_CHROMEDRIVER")
+        self.chrome_binary = chrome_binary
+        self.offline = offline or os.environ.get("UASK_DRIVER_OFFLINE") == "1"
+        self.source = None
+        self._resolved = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """Path of a ChromeDriver matching the local Chrome"""
+        with self._lock:
+            if self._resolved is None:
+                self._resolved = self._resolve()
+            return self._resolved
+
+    def _resolve(self):
+        if self.driver_path:
+            if not os.path.isfile(self.driver_path):
+                raise DriverResolutionError(f"ChromeDriver not found: {self.driver_path}")
+            self.source = "explicit"
+            return self.driver_path
+
+        chrome = find_chrome(self.chrome_binary)
+        installed = self.cache.install_path(chrome)
+        if os.path.exists(installed):
+            self.source = "cache"
+            return installed
+
+        # New or updated Chrome: read its version and fill the cache under the lock
+        version = chrome_version(chrome)
+        with self.cache.lock():
+            if os.path.exists(installed):
+                self.source = "cache"
+                return installed
+            by_version = self.cache.version_path(version)
+            if os.path.exists(by_version):
+                self.source = "cache"
+                self.cache.add(by_version, version, chrome)
+                return installed
+            if self.offline:
+                raise DriverResolutionError(
+                    f"No cached ChromeDriver for Chrome {version} in {self.cache.directory}; "
+                    "run `python -m utils.driver_cache warm` on a connected machine or pass --chromedriver"
+                )
+            # Pinned: webdriver-manager would otherwise detect the system Chrome, not the resolved one
+            downloaded = ChromeDriverManager(driver_version=version).install()
+            self.cache.add(downloaded, version, chrome)
+            self.source = "download"
+            return installed
+
+
+_resolver = None
+
+
+def configure_driver_resolver(**options):
+    global _resolver
+    _resolver = DriverResolver(**options)
+    return _resolver
+
+
+def get_driver_resolver():
+    global _resolver
+    if _resolver is None:
+        _resolver = DriverResolver()
+    return _resolver
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the shared ChromeDriver cache")
+    parser.add_argument("command", choices=("warm", "show"),
+                        help="warm: resolve (downloading if needed) and cache the driver; show: print the cached drivers")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE)
+    parser.add_argument("--chrome", help="Chrome binary, defaults to the installed one")
+    parser.add_argument("--from", dest="source", help="Add this chromedriver binary instead of downloading")
+    args = parser.parse_args(argv)
+
+    cache = DriverCache(args.cache_dir)
+    if args.command == "show":
+        versions = os.path.join(args.cache_dir, "versions")
+        for major in sorted(os.listdir(versions), key=int) if os.path.isdir(versions) else []:
+            driver = cache.version_path(major)
+            output = subprocess.run([driver, "--version"], capture_output=True, text=True, timeout=30).stdout
+            print(f"Chrome {major}: {output.strip() or driver}")
+        return
+
+    chrome = find_chrome(args.chrome)
+    if args.source:
+        version = chrome_version(chrome)
+        with cache.lock():
+            cache.add(args.source, version, chrome)
+        print(f"Cached {args.source} for Chrome {version}: {cache.install_path(chrome)}")
+        return
+    resolver = DriverResolver(cache_dir=args.cache_dir, chrome_binary=chrome)
+    print(f"ChromeDriver for {chrome} ({resolver.resolve()}, {resolver.source})")
+
+
+if __name__ == "__main__":
+    main()
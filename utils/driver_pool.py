@@ -0,0 +1,246 @@
+import queue
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
+from utils.browser_profiles import block_resources, chrome_options
+from utils.driver_cache import get_driver_resolver
+from utils.network_capture import attach_capture
+from utils.network_matrix import NetworkCondition
+from utils.timeouts import CaptchaBlocked, wait_until
+from utils.timing import span, timed
+
+
+def create_driver(profile="full", capture=None):
+    """
+    Launch Chrome with the options of a browser profile (see utils.browser_profiles).
+    With `capture` (keyword arguments for attach_capture) the browser runs behind
+    a selenium-wire proxy that records its traffic.
+    """
+    options = chrome_options(profile)
+
+    with span("driver resolve"):
+        service = Service(get_driver_resolver().resolve())
+    if capture is None:
+        with span("chrome launch"):
+            driver = webdriver.Chrome(service=service, options=options)
+    else:
+        # selenium-wire pulls in its bundled mitmproxy, only import it when capturing
+        from seleniumwire import webdriver as wire_webdriver
+        # Send the stand-in on localhost through the proxy as well
+        options.add_argument("--proxy-bypass-list=<-loopback>")
+        with span("chrome launch"):
+            driver = wire_webdriver.Chrome(service=service, options=options,
+                                           seleniumwire_options={"disable_capture": True})
+        attach_capture(driver, **capture)
+    if profile == "lean":
+        block_resources(driver)
+    return driver
+
+
+@timed("disclaimer")
+def accept_disclaimer(driver, locators, timeout=None, lang="en"):
+    """Click the disclaimer button if it is shown, return True when clicked"""
+    try:
+        accept_button = wait_until(
+            driver, locators, "disclaimer",
+            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["home_page"]["accept_button"])),
+            lang, timeout,
+        )
+        accept_button.click()
+        return True
+    except CaptchaBlocked:
+        raise
+    except Exception as e:
+        print("Disclaimer button not found or already accepted:", e)
+        return False
+
+
+def wait_for_chat_ready(driver, locators, timeout=None, lang="en"):
+    """Wait for the chat input box to be present"""
+    return wait_until(
+        driver, locators, "chat_ready",
+        EC.presence_of_element_located((By.CSS_SELECTOR, locators["home_page"]["chat_input_box"])),
+        lang, timeout,
+    )
+
+
+class PooledDriver:
+    """Book-keeping for one browser held by the pool"""
+
+    def __init__(self, driver, launch_seconds):
+        self.driver = driver
+        self.launch_seconds = launch_seconds
+        self.uses = 0
+
+
+class DriverPool:
+    """
+    Keeps up to `size` browsers alive for the whole session and hands a clean,
+    bootstrapped session to each test. A browser is recycled after `max_uses`
+    tests or as soon as it raised a WebDriverException. With a WarmStart the
+    bootstrap reuses its English profile snapshot instead of clicking through.
+    """
+
+    def __init__(self, factory, locators, start_url, size=1, max_uses=20, warm_start=None):
+        self.factory = factory
+        self.warm_start = warm_start
+        self.locators = locators
+        self.start_url = start_url
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._all = []
+        self.stats = {
+            "launches": 0,
+            "launch_seconds": 0.0,
+            "reuses": 0,
+            "reset_seconds": 0.0,
+            "recycled": 0,
+        }
+
+    def _launch(self):
+        started = time.perf_counter()
+        driver = self.factory()
+        try:
+            self._bootstrap(driver)
+        except Exception:
+            driver.quit()
+            raise
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["launches"] += 1
+            self.stats["launch_seconds"] += elapsed
+        return PooledDriver(driver, elapsed)
+
+    def _bootstrap(self, driver):
+        if self.warm_start is not None:
+            self.warm_start.open(driver, "en")
+            return
+        with span("page load"):
+            driver.get(self.start_url)
+        accept_disclaimer(driver, self.locators)
+        wait_for_chat_ready(driver, self.locators)
+
+    @timed("pool reset")
+    def _reset(self, entry):
+        """Bring a used browser back to a fresh chat on the language root"""
+        driver = entry.driver
+        started = time.perf_counter()
+        # Tests may leave the browser offline or throttled (e.g. test_error_handling)
+        NetworkCondition.reset(driver)
+        new_session = driver.find_elements(By.CSS_SELECTOR, self.locators["chat_widget"]["new_session_button"])
+        if new_session and new_session[0].is_displayed():
+            new_session[0].click()
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        driver.delete_all_cookies()
+        self._bootstrap(driver)
+        with self._lock:
+            self.stats["reuses"] += 1
+            self.stats["reset_seconds"] += time.perf_counter() - started
+
+    def _discard(self, entry):
+        with self._lock:
+            self._created -= 1
+            self._all.remove(entry)
+            self.stats["recycled"] += 1
+        try:
+            entry.driver.quit()
+        except WebDriverException:
+            pass
+
+    def acquire(self, timeout=None):
+        """Return a ready driver, launching a new one while the pool is below size"""
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_launch = self._created < self.size
+                    if can_launch:
+                        self._created += 1
+                if can_launch:
+                    try:
+                        entry = self._launch()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                    with self._lock:
+                        self._all.append(entry)
+                    entry.uses += 1
+                    return entry
+                entry = self._idle.get(timeout=timeout)
+
+            try:
+                self._reset(entry)
+            except Exception as e:
+                # Never leak the slot: a captcha during the reset would otherwise block later acquires
+                self._discard(entry)
+                if not isinstance(e, WebDriverException):
+                    raise
+                continue
+            entry.uses += 1
+            return entry
+
+    def release(self, entry, broken=False):
+        """Return a driver to the pool, or quit it when broken or worn out"""
+        if broken or entry.uses >= self.max_uses:
+            self._discard(entry)
+        else:
+            self._idle.put(entry)
+
+    def close(self):
+        with self._lock:
+            entries = list(self._all)
+            self._all.clear()
+            self._created = 0
+        for entry in entries:
+            try:
+                entry.driver.quit()
+            except WebDriverException:
+                pass
+
+    def summary(self):
+        """Human readable line with the setup time saved by reusing browsers"""
+        launches = self.stats["launches"]
+        if not launches:
+            return "Driver pool: no browsers launched"
+        avg_launch = self.stats["launch_seconds"] / launches
+        saved = self.stats["reuses"] * avg_launch - self.stats["reset_seconds"]
+        return (
+            f"Driver pool: {launches} launches (avg {avg_launch:.1f}s), "
+            f"{self.stats['reuses']} reuses, {self.stats['recycled']} recycled, "
+            f"~{saved:.1f}s setup time saved"
+        )
+
+
+class ProfilePools:
+    """One DriverPool per browser profile, created on first use by `make_pool(profile)`"""
+
+    def __init__(self, make_pool):
+        self.make_pool = make_pool
+        self.pools = {}
+        self._lock = threading.Lock()
+
+    def get(self, profile):
+        with self._lock:
+            if profile not in self.pools:
+                self.pools[profile] = self.make_pool(profile)
+            return self.pools[profile]
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.close()
+
+    def summary(self):
+        if not self.pools:
+            return "Driver pool: no browsers launched"
+        if len(self.pools) == 1:
+            return next(iter(self.pools.values())).summary()
+        return "\n".join(f"[{profile}] {pool.summary()}" for profile, pool in self.pools.items())
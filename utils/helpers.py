@@ -1,80 +1,397 @@
-import json
 import os
-import html
+import time
 from datetime import datetime
+from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.common.exceptions import TimeoutException, WebDriverException
+from utils.matching import matcher_for, precompile
+from utils.registry import get_locators, get_test_data
+from utils.response_cache import get_response_cache
+from utils.result_sink import get_sink
+from utils.screenshots import get_screenshot_service
+from utils.semantic import get_semantic_scorer
+from utils.timeline import record_timeline, timeline_metrics
+from utils.timeouts import CaptchaBlocked, get_timeout_policy, wait_until
+from utils.timing import span, timed
+from utils.visual import get_visual_checker
 
 
+# Compile the keyword matchers for all test data once, at import
+precompile(get_test_data())
+
+# Resolves with the bot bubble once it has text, the loading spinner is gone and
+# neither the bubble's text nor the spinner changed for the quiet period, or with
+# "captcha" as soon as a captcha frame is shown. Other page mutations
+# (animations, badges, clocks) do not restart the quiet timer.
+RESPONSE_COMPLETE_JS = """
+var selector = arguments[0], spinnerSelector = arguments[1], quietMs = arguments[2],
+    previous = arguments[3], captchaSelector = arguments[4], done = arguments[arguments.length - 1];
+var timer = null, lastBubble = null, lastLength = -1, lastSpinner = null;
+
+function spinnerVisible() {
+    var spinner = document.querySelector(spinnerSelector);
+    return spinner !== null && spinner.offsetParent !== null;
+}
+function currentBubble() {
+    var bubble = document.querySelector(selector);
+    return bubble && bubble !== previous && bubble.textContent.trim() ? bubble : null;
+}
+function captchaVisible() {
+    // Invisible reCAPTCHA frames are on ordinary pages too; only a shown, sized frame blocks
+    return Array.prototype.some.call(document.querySelectorAll(captchaSelector), function (frame) {
+        var rect = frame.getBoundingClientRect();
+        return frame.offsetParent !== null && getComputedStyle(frame).visibility !== "hidden"
+            && rect.width > 0 && rect.height > 0;
+    });
+}
+function check() {
+    if (captchaVisible()) {
+        clearTimeout(timer);
+        observer.disconnect();
+        done("captcha");
+        return;
+    }
+    var bubble = currentBubble(), length = bubble ? bubble.textContent.length : -1, spinner = spinnerVisible();
+    if (bubble === lastBubble && length === lastLength && spinner === lastSpinner) return;
+    lastBubble = bubble;
+    lastLength = length;
+    lastSpinner = spinner;
+    clearTimeout(timer);
+    if (!bubble || spinner) return;
+    timer = setTimeout(function () {
+        var bubble = currentBubble();
+        if (bubble && !spinnerVisible()) {
+            observer.disconnect();
+            done(bubble);
+        }
+    }, quietMs);
+}
+var observer = new MutationObserver(check);
+observer.observe(document.body, {childList: true, subtree: true, characterData: true, attributes: true});
+check();
+"""
+
+# Records when the spinner first shows and every growth of the new bot bubble's
+# text, buffered in the page and collected in one call after the answer completes.
+RESPONSE_PROBE_JS = """
+var spinnerSelector = arguments[0], selector = arguments[1], previous = arguments[2];
+var probe = {start: performance.now(), spinner: null, firstText: null, lastChange: null, length: 0, events: []};
+
+function spinnerVisible() {
+    var spinner = document.querySelector(spinnerSelector);
+    return spinner !== null && spinner.offsetParent !== null;
+}
+function record() {
+    var now = performance.now();
+    if (probe.spinner === null && spinnerVisible()) probe.spinner = now;
+    var bubble = document.querySelector(selector);
+    if (!bubble || bubble === previous) return;
+    var length = bubble.textContent.trim().length;
+    if (length && probe.firstText === null) probe.firstText = now;
+    if (length !== probe.length) {
+        probe.length = length;
+        probe.lastChange = now;
+        probe.events.push([now - probe.start, length]);
+    }
+}
+if (window.__uaskProbeObserver) window.__uaskProbeObserver.disconnect();
+window.__uaskProbeObserver = new MutationObserver(record);
+window.__uaskProbeObserver.observe(document.body, {childList: true, subtree: true, characterData: true, attributes: true});
+window.__uaskProbe = probe;
+"""
 
 
 def load_locators():
-    with open(os.path.join(os.path.dirname(__file__), '../data/locators.json')) as f:
-        return json.load(f)
+    """Read-only locators, parsed and validated once per process by utils.registry"""
+    return get_locators()
 
 def load_test_data():
-    with open(os.path.join(os.path.dirname(__file__), '../data/test-data.json')) as f:
-        return json.load(f)
+    """Read-only test data, parsed and validated once per process by utils.registry"""
+    return get_test_data()
     
+@timed("screenshot")
 def save_screenshot(driver, test_name):
-    """Save a screenshot of the current page and log message input"""
-    folder = "screenshots"
-    os.makedirs(folder, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    screenshot_path = os.path.join(folder, f"{test_name}_{timestamp}.png")
-    driver.save_screenshot(screenshot_path)
-
-
-def log_validation_result(lang, query, response_text, passed, failure_reasons=None):
-    """Log validation details with UTF-8 support and full AI response"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    status = "PASS" if passed else "FAIL"
-
-    log_entry = (
-        f"\n{'-'*60}\n"
-        f"Timestamp       : {timestamp}\n"
-        f"Language        : {lang.upper()}\n"
-        f"Query           : {html.escape(query[:200])}\n"
-        f"Status          : {status}\n"
-        f"AI Full Response:\n{html.escape(response_text)}\n"
+    """
+    Screenshot the current page through the screenshot service; encoding and
+    writing happen in the background. Returns the file path, or None when the
+    configured mode only keeps frames for failing tests. With visual regression
+    on, the file is queued for comparison with its baseline after the run.
+    """
+    path = get_screenshot_service().capture(driver, test_name)
+    checker = get_visual_checker()
+    if checker.enabled and path:
+        checker.add(test_name, path, checker.record_masks(driver, test_name, get_locators()))
+    return path
+
+
+@timed()
+def log_validation_result(lang, query, response_text, passed, failure_reasons=None, timeline=None, screenshot=None):
+    """Queue a structured validation record for the background result sink"""
+    record = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "test": os.environ.get("PYTEST_CURRENT_TEST", "").rsplit(" ", 1)[0],
+        "run": os.environ.get("UASK_RUN_ID"),
+        "site": os.environ.get("UASK_SITE"),
+        "lang": lang,
+        "query": query,
+        "status": "PASS" if passed else "FAIL",
+        "failure_reasons": list(failure_reasons or []) if not passed else [],
+        "response": response_text,
+        "timeline": timeline,
+        "screenshot": screenshot,
+    }
+    get_sink().emit(record)
+    get_semantic_scorer().add(record)
+
+
+def response_selector(locators, lang):
+    """CSS selector of the latest bot bubble for a language"""
+    return locators["chat_widget"]["ai_message_rtl" if lang == "ar" else "ai_message"]
+
+
+def current_response(driver, locators, lang="en"):
+    """Return the latest bot bubble before sending, so the waiter can skip it"""
+    bubbles = driver.find_elements(By.CSS_SELECTOR, response_selector(locators, lang))
+    return bubbles[0] if bubbles else None
+
+
+@timed()
+def wait_for_response(driver, locators, lang="en", previous=None, timeout=None, quiet_period=1.0):
+    """
+    Block until the bot has finished answering and return the response element.
+    A MutationObserver in the page resolves one async script call once the bubble
+    has been stable for `quiet_period` seconds and the loading spinner is gone.
+    The deadline comes from the timeout policy unless `timeout` is given, and a
+    captcha raises CaptchaBlocked immediately.
+    """
+    policy = get_timeout_policy()
+    if timeout is None:
+        timeout = policy.timeout("response", lang)
+    old_timeout = driver.timeouts.script
+    driver.set_script_timeout(timeout)
+    started = time.perf_counter()
+    try:
+        response = driver.execute_async_script(
+            RESPONSE_COMPLETE_JS,
+            response_selector(locators, lang),
+            locators["chat_widget"]["loading_spinner"],
+            int(quiet_period * 1000),
+            previous,
+            locators["chat_widget"]["captcha_blocker"],
+        )
+    finally:
+        driver.set_script_timeout(old_timeout)
+    if response == "captcha":
+        raise CaptchaBlocked("Captcha shown instead of an answer")
+    policy.record("response", lang, time.perf_counter() - started)
+    return response
+
+
+@timed("typing")
+def input_text(driver, element):
+    """Current text of an input, textarea or contenteditable element"""
+    return driver.execute_script(
+        "return arguments[0].isContentEditable ? arguments[0].innerText : arguments[0].value;", element
+    ) or ""
+
+
+@timed("typing")
+def insert_text(driver, element, text: str):
+    """
+    Put a whole string into the field at once, which is RTL-safe for Arabic.
+    Uses CDP Input.insertText and only falls back to typing the text when the
+    field does not end up holding exactly that string.
+    """
+    driver.execute_script(
+        "var el = arguments[0]; el.focus();"
+        "if (el.isContentEditable) { el.innerText = ''; } else { el.value = ''; }",
+        element,
+    )
+    try:
+        driver.execute_cdp_cmd("Input.insertText", {"text": text})
+    except (AttributeError, WebDriverException):
+        pass
+
+    if input_text(driver, element).strip() == text.strip():
+        return element
+
+    driver.execute_script(
+        "var el = arguments[0]; if (el.isContentEditable) { el.innerText = ''; } else { el.value = ''; }",
+        element,
     )
+    ActionChains(driver).move_to_element(element).click().send_keys(text).perform()
+    return element
 
-    if not passed:
-        log_entry += (
-            f"Failure Reasons : {', '.join(failure_reasons)}\n"
+
+def validate_response(response, lang, expected_keywords, query=""):
+    """Validate a response element (or API ChatResponse) with logging"""
+    response_text = response.text.strip()
+    timeline = getattr(response, "timeline", None)
+    screenshot = getattr(response, "screenshot_path", None)
+    validation_passed = True
+    failure_reasons = []
+
+    try:
+        assert len(response_text) > 20, "Response too short"
+        assert not response_text.endswith("..."), "Incomplete response"
+        #assert not any(tag in response_text for tag in ["<div", "<script", "</"]), "Broken HTML"
+
+        # All keywords are matched in one normalized pass over the response
+        if lang == "en":
+            for keyword in matcher_for(expected_keywords, "en").missing(response_text):
+                failure_reasons.append(f"Missing English keyword: {keyword}")
+                validation_passed = False
+
+        elif lang == "ar":
+            for keyword in matcher_for(expected_keywords, "ar").missing(response_text):
+                failure_reasons.append(f"Missing Arabic keyword: {keyword}")
+                validation_passed = False
+            if not any(char in response_text for char in ["ء", "آ", "أ"]):
+                failure_reasons.append("No characteristic Arabic letters found")
+                validation_passed = False
+
+        log_validation_result(
+            lang=lang,
+            query=query,
+            response_text=response_text,
+            passed=validation_passed,
+            failure_reasons=failure_reasons if not validation_passed else None,
+            timeline=timeline,
+            screenshot=screenshot,
+        )
+
+        if not validation_passed:
+            raise AssertionError(f"Validation failed: {', '.join(failure_reasons)}")
+
+    except Exception as e:
+        log_validation_result(
+            lang=lang,
+            query=query,
+            response_text=response_text,
+            passed=False,
+            failure_reasons=[str(e)],
+            timeline=timeline,
+            screenshot=screenshot,
         )
+        raise
+
+
+def injection_surface(response):
+    """
+    Markup an XSS check inspects: the rendered DOM of a bot bubble in the browser,
+    or the raw backend payload of an API answer (its innerHTML is only escaped
+    client-side, so markers could never show up there).
+    """
+    payload = getattr(response, "payload", None)
+    return payload if payload is not None else response.get_attribute("innerHTML")
+
+
+def find_xss_markers(response_html, expected_strings):
+    """Return the XSS failure reasons for markers that survived into the rendered HTML"""
+    return [f"XSS: {tag} detected" for tag in matcher_for(expected_strings, "raw").find(response_html)]
+
+
+def find_rejection_phrases(response_text, expected_phrases):
+    """Return the rejection phrases present in a response"""
+    return matcher_for(expected_phrases, "en").find(response_text)
 
-    os.makedirs("logs", exist_ok=True)
 
-    # Write to both console and file
-    print(log_entry)
-    with open("logs/validation.log", "a", encoding="utf-8") as f:
-        f.write(log_entry)
+def start_response_probe(driver, locators, lang="en", previous=None):
+    """Install the page-side timing probe right before a message is sent"""
+    driver.execute_script(
+        RESPONSE_PROBE_JS,
+        locators["chat_widget"]["loading_spinner"],
+        response_selector(locators, lang),
+        previous,
+    )
+
+
+def collect_response_probe(driver):
+    """Stop the probe and return its timings and growth events in seconds since it was installed"""
+    probe = driver.execute_script(
+        "if (window.__uaskProbeObserver) window.__uaskProbeObserver.disconnect();"
+        "return window.__uaskProbe || null;"
+    )
+    if not probe:
+        return {}
+
+    def since_start(key):
+        return None if probe[key] is None else (probe[key] - probe["start"]) / 1000.0
+
+    return {
+        "time_to_spinner": since_start("spinner"),
+        "time_to_first_text": since_start("firstText"),
+        "time_to_complete": since_start("lastChange"),
+        "events": [(t / 1000.0, length) for t, length in probe["events"]],
+    }
 
 
+def collect_timeline(driver, response=None):
+    """
+    Collect the probe's growth events, derive the streaming metrics, record them
+    for the report and attach them to the response element as `timeline`.
+    """
+    events = collect_response_probe(driver).get("events", [])
+    metrics = timeline_metrics(events, source="browser")
+    record_timeline(metrics)
+    if response is not None:
+        response.timeline = metrics
+        response.timeline_events = events
+    return metrics
+
+
+def cache_response(query, lang, response):
+    """
+    Record a completed live browser answer when the cache is recording and wants
+    it (refresh mode keeps fresh recordings). Stand-in answers are never recorded.
+    """
+    cache = get_response_cache()
+    if not cache.wants(query, lang):
+        return
+    timeline = getattr(response, "timeline", None) or {}
+    cache.store(query, lang, response.text, response.get_attribute("innerHTML"),
+                getattr(response, "timeline_events", []), timeline.get("duration"))
+
+
+@timed()
 def setup_chat(driver, locators, language):
     """Set up the chat widget and switch language if needed"""
     if language == "ar":
-        lang_button = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["home_page"]["language_button"]))
+        lang_button = wait_until(
+            driver, locators, "language_switch",
+            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["home_page"]["language_button"])),
         )
         lang_button.click()
 
-    return WebDriverWait(driver, 30).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, locators["chat_widget"]["input_field"]))
+    return wait_until(
+        driver, locators, "input",
+        EC.presence_of_element_located((By.CSS_SELECTOR, locators["chat_widget"]["input_field"])),
+        language,
     )
 
 
-def send_message(driver, locators, message: str):
-    """Send a message to the chatbot and return the AI response element, with error handling."""
+@timed()
+def send_message(driver, locators, message: str, lang="en"):
+    """
+    Send a message to the chatbot and return the completed AI response element, with error handling.
+    The streaming metrics of the answer are attached to the element as `timeline`; the raw
+    probe timings stay readable with collect_response_probe.
+    """
     try:
-        input_box = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["chat_widget"]["input_field"]))
+        previous = current_response(driver, locators, lang)
+        input_box = wait_until(
+            driver, locators, "input",
+            EC.element_to_be_clickable((By.CSS_SELECTOR, locators["chat_widget"]["input_field"])),
+            lang,
         )
-        input_box.send_keys(message + Keys.ENTER)
+        with span("typing"):
+            input_box.send_keys(message)
+        # Start the clock at submit, so the input wait and typing don't count towards the answer
+        start_response_probe(driver, locators, lang, previous)
+        input_box.send_keys(Keys.ENTER)
     except TimeoutException:
         save_screenshot(driver, "input_field_timeout")
         raise AssertionError("Timeout: Chat input field not found or clickable.")
@@ -83,10 +400,11 @@ def send_message(driver, locators, message: str):
         raise AssertionError(f"WebDriverException during input field interaction: {e}")
 
     try:
-        WebDriverWait(driver, 60).until(
-            lambda d: d.find_elements(By.CSS_SELECTOR, locators["chat_widget"]["ai_message"])
-        )
-        return driver.find_element(By.CSS_SELECTOR, locators["chat_widget"]["ai_message"])
+        response = wait_for_response(driver, locators, lang, previous=previous)
     except TimeoutException:
         save_screenshot(driver, "ai_response_timeout")
         raise AssertionError("Timeout: AI response not received.")
+
+    collect_timeline(driver, response)
+    cache_response(message, lang, response)
+    return response
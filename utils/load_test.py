@@ -0,0 +1,243 @@
+"""
+Concurrent load-and-latency harness for the chatbot.
+
+Replays the queries from data/test-data.json over K concurrent sessions at a
+target request rate and reports p50/p90/p99 latencies, throughput and error
+rate per language:
+
+    python -m utils.load_test --stand-in --sessions 4 --rate 2 --iterations 5
+    python -m utils.load_test --mode browser --base-url https://ask.u.ae/ --sessions 2
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from selenium.webdriver.common.by import By
+from utils.api_client import ChatClient
+from utils.driver_pool import DriverPool, accept_disclaimer, create_driver, wait_for_chat_ready
+from utils.helpers import collect_response_probe, load_locators, load_test_data, send_message, validate_response
+
+
+METRICS = ("time_to_spinner", "time_to_first_text", "time_to_complete")
+
+
+def build_queries(test_data, languages=("en", "ar"), iterations=1):
+    """(query, lang, expected_keywords) for every common query, repeated `iterations` times"""
+    queries = [
+        (query_data[lang], lang, query_data["expected_keywords"][lang])
+        for query_data in test_data["response_validation"]["common_queries"]
+        for lang in languages
+    ]
+    return queries * iterations
+
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a list of numbers, None when empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class ApiSession:
+    """One load-test session talking to the chat backend over HTTP"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def ask(self, query, lang):
+        response = self.client.ask(query, lang)
+        if response.captcha:
+            raise AssertionError("Captcha returned instead of an answer")
+        timings = {
+            "time_to_spinner": None,
+            "time_to_first_text": response.first_chunk_seconds,
+            "time_to_complete": response.elapsed,
+        }
+        return response, timings
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BrowserSession:
+    """One load-test session driving a pooled browser through send_message"""
+
+    def __init__(self, pool, locators, site_url):
+        self.pool = pool
+        self.locators = locators
+        self.site_url = site_url
+        self.entry = pool.acquire()
+        self.lang = "en"
+
+    def ask(self, query, lang):
+        driver = self.entry.driver
+        if lang != self.lang:
+            driver.get(self.site_url + lang + "/")
+            accept_disclaimer(driver, self.locators)
+            wait_for_chat_ready(driver, self.locators)
+            self.lang = lang
+        response = send_message(driver, self.locators, query, lang)
+        return response, collect_response_probe(driver)
+
+    def reset(self):
+        """Start a new conversation so long runs do not grow one chat history"""
+        buttons = self.entry.driver.find_elements(By.CSS_SELECTOR, self.locators["chat_widget"]["new_session_button"])
+        if buttons and buttons[0].is_displayed():
+            buttons[0].click()
+
+    def close(self):
+        self.pool.release(self.entry)
+
+
+def run_load(session_factory, queries, sessions=1, rate=None, validate=True):
+    """
+    Run `queries` across `sessions` worker threads. With `rate` (requests/second)
+    query i is not started before i / rate seconds into the run.
+    Returns (results, wall_seconds).
+    """
+    work = queue.Queue()
+    for index, item in enumerate(queries):
+        work.put((index, item))
+    results = []
+    results_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def worker():
+        session = session_factory()
+        try:
+            while True:
+                try:
+                    index, (query, lang, expected_keywords) = work.get_nowait()
+                except queue.Empty:
+                    return
+                if rate:
+                    delay = started + index / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                result = {"lang": lang, "query": query, "ok": True, "error": None}
+                result.update(dict.fromkeys(METRICS))
+                try:
+                    response, timings = session.ask(query, lang)
+                    result.update(timings)
+                    if validate:
+                        validate_response(response, lang, expected_keywords, query=query)
+                except Exception as e:
+                    result["ok"] = False
+                    result["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                with results_lock:
+                    results.append(result)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall_seconds):
+    """Per-language (and overall) count, error rate, throughput and latency percentiles"""
+    groups = {}
+    for result in results:
+        groups.setdefault(result["lang"], []).append(result)
+    groups["all"] = list(results)
+
+    summary = {}
+    for lang, items in groups.items():
+        errors = sum(1 for item in items if not item["ok"])
+        stats = {
+            "count": len(items),
+            "errors": errors,
+            "error_rate": errors / len(items) if items else 0.0,
+            "throughput": len(items) / wall_seconds if wall_seconds else 0.0,
+        }
+        for metric in METRICS:
+            values = [item[metric] for item in items if item["ok"] and item[metric] is not None]
+            for pct in (50, 90, 99):
+                stats[f"{metric}_p{pct}"] = percentile(values, pct)
+        summary[lang] = stats
+    return summary
+
+
+def format_table(summary):
+    """Render the summary as a plain-text table per language"""
+    def seconds(value):
+        return "-" if value is None else f"{value:.3f}s"
+
+    lines = []
+    for lang, stats in summary.items():
+        lines.append(
+            f"[{lang.upper()}] requests: {stats['count']}  errors: {stats['errors']} "
+            f"({stats['error_rate']:.1%})  throughput: {stats['throughput']:.2f} req/s"
+        )
+        lines.append(f"  {'metric':<20}{'p50':>10}{'p90':>10}{'p99':>10}")
+        for metric in METRICS:
+            lines.append(
+                f"  {metric:<20}"
+                + "".join(f"{seconds(stats[f'{metric}_p{pct}']):>10}" for pct in (50, 90, 99))
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load and latency test for the U-Ask chatbot")
+    parser.add_argument("--mode", choices=["api", "browser"], default="api")
+    parser.add_argument("--base-url", default="https://ask.u.ae/", help="Site (browser) or backend (api) root")
+    parser.add_argument("--stand-in", action="store_true", help="Start the local stand-in and target it")
+    parser.add_argument("--sessions", type=int, default=2, help="Concurrent sessions")
+    parser.add_argument("--rate", type=float, default=None, help="Target requests per second across sessions")
+    parser.add_argument("--iterations", type=int, default=1, help="Times to replay the query set")
+    parser.add_argument("--languages", default="en,ar")
+    parser.add_argument("--no-validate", action="store_true", help="Only measure, skip keyword validation")
+    parser.add_argument("--output", help="Write raw results and summary as JSON")
+    args = parser.parse_args(argv)
+
+    server = None
+    base_url = args.base_url
+    if args.stand_in:
+        from utils.stand_in import StandInServer
+        server = StandInServer()
+        base_url = server.start()
+
+    queries = build_queries(load_test_data(), args.languages.split(","), args.iterations)
+    pool = client = None
+    try:
+        if args.mode == "api":
+            client = ChatClient(base_url, max_connections=args.sessions)
+            session_factory = lambda: ApiSession(client)
+        else:
+            locators = load_locators()
+            pool = DriverPool(create_driver, locators, base_url + "en/", size=args.sessions,
+                              max_uses=len(queries) + 1)
+            session_factory = lambda: BrowserSession(pool, locators, base_url)
+
+        results, wall_seconds = run_load(session_factory, queries, args.sessions, args.rate,
+                                         validate=not args.no_validate)
+    finally:
+        if client is not None:
+            client.close()
+        if pool is not None:
+            pool.close()
+        if server is not None:
+            server.stop()
+
+    summary = summarize(results, wall_seconds)
+    print(format_table(summary))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": results}, f, ensure_ascii=False, indent=2)
+    return 1 if summary["all"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
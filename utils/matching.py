@@ -0,0 +1,121 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+
+# Tashkeel (harakat, tanween, shadda, sukun, superscript alef) and tatweel
+ARABIC_DIACRITICS = re.compile("[\u064B-\u065F\u0670\u0640]")
+ARABIC_FOLDING = str.maketrans({
+    "أ": "ا",  # alef with hamza above -> alef
+    "إ": "ا",  # alef with hamza below -> alef
+    "آ": "ا",  # alef with madda -> alef
+    "ٱ": "ا",  # alef wasla -> alef
+    "ى": "ي",  # alef maksura -> yaa
+    "ة": "ه",  # taa marbuta -> haa
+    "ؤ": "و",  # waw with hamza -> waw
+    "ئ": "ي",  # yaa with hamza -> yaa
+})
+# Definite article, optionally fused with a conjunction or preposition
+ARABIC_ARTICLE = re.compile(r"^(?:[وفبك]?ال|لل)(?=\w{2,})")
+PUNCTUATION = re.compile(r"[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text, lang="en"):
+    """
+    Fold text for keyword matching.
+      en   case-folded, punctuation removed, whitespace collapsed
+      ar   additionally tashkeel/tatweel removed, alef/yaa/taa-marbuta folded
+           and the definite article stripped from every word
+      raw  case-folded only, for markup such as XSS markers
+    """
+    text = text.casefold()
+    if lang == "raw":
+        return text
+    if lang == "ar":
+        text = ARABIC_DIACRITICS.sub("", text).translate(ARABIC_FOLDING)
+    text = WHITESPACE.sub(" ", PUNCTUATION.sub(" ", text)).strip()
+    if lang == "ar":
+        text = " ".join(ARABIC_ARTICLE.sub("", word) for word in text.split(" "))
+    return text
+
+
+class KeywordMatcher:
+    """
+    Aho–Corasick automaton over normalized keywords: one pass over a response
+    finds every keyword, however many there are.
+    """
+
+    def __init__(self, keywords, lang="en"):
+        self.lang = lang
+        self.keywords = tuple(keywords)
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for index, keyword in enumerate(self.keywords):
+            self._add(normalize(keyword, lang), index)
+        self._link()
+
+    def _add(self, pattern, index):
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(index)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """Return the original keywords present in `text`"""
+        found = set()
+        state = 0
+        goto, fail, output = self._goto, self._fail, self._output
+        for char in normalize(text, self.lang):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return [self.keywords[index] for index in sorted(found)]
+
+    def missing(self, text):
+        """Return the original keywords absent from `text`, in their original order"""
+        found = set(self.find(text))
+        return [keyword for keyword in self.keywords if keyword not in found]
+
+
+@lru_cache(maxsize=1024)
+def _cached_matcher(keywords, lang):
+    return KeywordMatcher(keywords, lang)
+
+
+def matcher_for(keywords, lang="en"):
+    """Compiled matcher for a keyword set, built once per process"""
+    return _cached_matcher(tuple(keywords), lang)
+
+
+def precompile(test_data):
+    """Compile the matchers for every keyword set in test-data.json up front"""
+    for query_data in test_data["response_validation"]["common_queries"]:
+        for lang, keywords in query_data["expected_keywords"].items():
+            matcher_for(keywords, lang)
+    matcher_for(test_data["security_tests"]["xss_expected_strings"], "raw")
+    matcher_for(test_data["security_tests"]["expected_rejection_phrases"], "en")
@@ -0,0 +1,226 @@
+import json
+import os
+import re
+import threading
+import time
+import weakref
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import brotli
+import zstandard
+
+
+DEFAULT_FOLDER = "logs/network"
+CHAT_PATTERN = r"/api/chat"
+CATEGORIES = (
+    ("captcha", re.compile(r"captcha", re.I)),
+    ("analytics", re.compile(r"google-analytics|googletagmanager|doubleclick|hotjar|clarity\.ms|facebook\.net|/analytics", re.I)),
+    ("script", re.compile(r"\.m?js(\?|$)|javascript", re.I)),
+    ("style", re.compile(r"\.css(\?|$)|text/css", re.I)),
+    ("image", re.compile(r"\.(png|jpe?g|gif|svg|webp|ico)(\?|$)|^image/", re.I)),
+    ("font", re.compile(r"\.(woff2?|ttf|otf|eot)(\?|$)|^font/", re.I)),
+    ("document", re.compile(r"text/html", re.I)),
+)
+
+
+def _decoded_counter(encoding):
+    """Return a function giving the decoded size of each body chunk, without keeping the output"""
+    encoding = (encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return len
+    if encoding in ("gzip", "deflate", "x-gzip"):
+        decoder = zlib.decompressobj(47)  # auto-detect zlib or gzip headers
+        return lambda chunk: len(decoder.decompress(chunk))
+    if encoding == "br":
+        decoder = brotli.Decompressor()
+        return lambda chunk: len(decoder.process(chunk))
+    if encoding == "zstd":
+        decoder = zstandard.ZstdDecompressor().decompressobj()
+        return lambda chunk: len(decoder.decompress(chunk))
+    return None
+
+
+def _ms(start, end):
+    return round((end - start) * 1000, 1) if start is not None and end is not None else None
+
+
+class CaptureAddon:
+    """
+    mitmproxy addon for the selenium-wire proxy. Every response is streamed
+    through to the browser instead of buffered; bytes and chunk timings are
+    counted on the way, and one compact entry per exchange is handed to
+    `on_entry` once its body has been forwarded.
+    """
+
+    def __init__(self, on_entry, chat_pattern=CHAT_PATTERN):
+        self.on_entry = on_entry
+        self.chat_pattern = re.compile(chat_pattern)
+        self._seen_connections = weakref.WeakSet()
+
+    def category(self, url, mime):
+        if self.chat_pattern.search(url):
+            return "chat"
+        for name, pattern in CATEGORIES:
+            if pattern.search(url) or pattern.search(mime):
+                return name
+        return "other"
+
+    def responseheaders(self, flow):
+        flow.response.stream = self._measure(flow)
+
+    def _measure(self, flow):
+        encoding = flow.response.headers.get("content-encoding", "")
+        counter = _decoded_counter(encoding)
+
+        def stream(chunks):
+            wire_bytes, decoded_bytes, first, last = 0, 0, None, None
+            decodable = counter is not None
+            try:
+                for chunk in chunks:
+                    last = time.time()
+                    first = first or last
+                    wire_bytes += len(chunk)
+                    if decodable:
+                        try:
+                            decoded_bytes += counter(chunk)
+                        except Exception:
+                            decodable = False
+                    yield chunk
+            finally:
+                decoded = decoded_bytes if decodable else None
+                self.on_entry(self._entry(flow, encoding, wire_bytes, decoded, first, last))
+
+        return stream
+
+    def _entry(self, flow, encoding, wire_bytes, decoded_bytes, first_chunk, last_chunk):
+        request, response, server = flow.request, flow.response, flow.server_conn
+        connect = ssl = None
+        if server is not None and server not in self._seen_connections and server.timestamp_tcp_setup:
+            self._seen_connections.add(server)
+            connect = _ms(server.timestamp_start, server.timestamp_tcp_setup)
+            ssl = _ms(server.timestamp_tcp_setup, server.timestamp_tls_setup)
+        mime = response.headers.get("content-type", "").split(";")[0]
+        finished = last_chunk or response.timestamp_start
+        return {
+            "startedDateTime": datetime.fromtimestamp(request.timestamp_start, timezone.utc).isoformat(),
+            "time": _ms(request.timestamp_start, finished),
+            "method": request.method,
+            "url": request.url,
+            "httpVersion": response.http_version,
+            "status": response.status_code,
+            "mimeType": mime,
+            "category": self.category(request.url, mime),
+            "requestBytes": len(request.raw_content or b""),
+            "responseBytes": wire_bytes,
+            "decodedBytes": decoded_bytes,
+            "contentEncoding": encoding or None,
+            "timings": {
+                "connect": connect,
+                "ssl": ssl,
+                "send": _ms(request.timestamp_start, request.timestamp_end),
+                "wait": _ms(request.timestamp_end, response.timestamp_start),
+                "firstChunk": _ms(response.timestamp_start, first_chunk),
+                "receive": _ms(response.timestamp_start, finished),
+            },
+        }
+
+    def error(self, flow):
+        self.on_entry({
+            "startedDateTime": datetime.fromtimestamp(flow.request.timestamp_start, timezone.utc).isoformat(),
+            "method": flow.request.method,
+            "url": flow.request.url,
+            "category": self.category(flow.request.url, ""),
+            "error": str(flow.error),
+        })
+
+
+class NetworkCapture:
+    """
+    Per-browser capture target. Between start() and stop() every entry is
+    appended to a HAR-like file as it arrives, so nothing but running totals is
+    kept in memory; stop() closes the file with a summary of the test's traffic.
+    """
+
+    def __init__(self, folder=DEFAULT_FOLDER):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._first = True
+        self._totals = None
+        self._chat = None
+
+    def start(self, test_name):
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, re.sub(r"[^\w.-]+", "_", test_name)[:150] + ".har")
+        with self._lock:
+            self._file = open(path, "w", encoding="utf-8")
+            self._file.write('{"log": {"version": "1.2", "creator": {"name": "uask-capture"}, "entries": [\n')
+            self._path = path
+            self._first = True
+            self._totals = defaultdict(lambda: {"requests": 0, "bytes": 0, "decoded_bytes": 0, "ms": 0.0})
+            self._chat = []
+        return path
+
+    def add(self, entry):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(("" if self._first else ",\n") + json.dumps(entry, ensure_ascii=False))
+            self._first = False
+            totals = self._totals[entry["category"]]
+            totals["requests"] += 1
+            totals["bytes"] += entry.get("responseBytes") or 0
+            totals["decoded_bytes"] += entry.get("decodedBytes") or entry.get("responseBytes") or 0
+            totals["ms"] += entry.get("time") or 0
+            if entry["category"] == "chat":
+                self._chat.append({
+                    "url": entry["url"],
+                    "status": entry.get("status"),
+                    "httpVersion": entry.get("httpVersion"),
+                    "wait": (entry.get("timings") or {}).get("wait"),
+                    "firstChunk": (entry.get("timings") or {}).get("firstChunk"),
+                    "receive": (entry.get("timings") or {}).get("receive"),
+                    "bytes": entry.get("responseBytes"),
+                    "error": entry.get("error"),
+                })
+
+    def stop(self):
+        """Close the test's file and return (path, summary)"""
+        with self._lock:
+            if self._file is None:
+                return None, None
+            summary = {"categories": dict(self._totals), "chat": self._chat}
+            self._file.write('\n], "_summary": ' + json.dumps(summary) + "}}\n")
+            self._file.close()
+            path, self._file = self._path, None
+        return path, summary
+
+
+def format_summary(summary):
+    """Readable breakdown for the report: chat calls first, then traffic per category"""
+    lines = []
+    for call in summary["chat"]:
+        if call["error"]:
+            lines.append(f"chat {call['url']}: {call['error']}")
+        else:
+            lines.append(
+                f"chat {call['status']} {call['httpVersion']}: wait {call['wait']} ms, "
+                f"first chunk {call['firstChunk']} ms, streamed {call['receive']} ms, {call['bytes']} B"
+            )
+    for name, totals in sorted(summary["categories"].items(), key=lambda item: item[1]["ms"], reverse=True):
+        lines.append(
+            f"{name:<10} {totals['requests']:>4} requests {totals['bytes']:>10} B on the wire "
+            f"({totals['decoded_bytes']} B decoded) {totals['ms'] / 1000:>8.2f}s"
+        )
+    return "\n".join(lines)
+
+
+def attach_capture(driver, folder=DEFAULT_FOLDER, chat_pattern=CHAT_PATTERN):
+    """Hook a NetworkCapture into a selenium-wire driver's proxy"""
+    capture = NetworkCapture(folder)
+    driver.backend.master.addons.add(CaptureAddon(capture.add, chat_pattern))
+    driver.network_capture = capture
+    return capture
@@ -0,0 +1,187 @@
+import json
+import os
+import statistics
+import threading
+from collections import defaultdict, deque
+import pytest
+
+
+DEFAULT_BASELINE = "data/network-baseline.json"
+METRICS = ("load_to_interactive", "time_to_spinner", "time_to_complete")
+
+# latency in ms, throughput in kbit/s, packet loss in percent
+PROFILES = {
+    "fiber": {"latency": 2, "download": 100000, "upload": 50000, "packet_loss": 0},
+    "4g": {"latency": 70, "download": 12000, "upload": 6000, "packet_loss": 0},
+    "3g": {"latency": 300, "download": 1600, "upload": 750, "packet_loss": 0},
+    "satellite": {"latency": 650, "download": 10000, "upload": 2000, "packet_loss": 0},
+    "lossy": {"latency": 100, "download": 5000, "upload": 2000, "packet_loss": 5},
+}
+CPU_RATES = (1, 4)
+
+# Samples recorded during the current test, drained into its report by the plugin
+_samples = deque(maxlen=1000)
+_samples_lock = threading.Lock()
+
+
+class NetworkCondition:
+    """One cell of the matrix: a network profile combined with a CPU slowdown factor"""
+
+    def __init__(self, profile, cpu_rate=1):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown network profile: {profile}")
+        self.profile = profile
+        self.cpu_rate = cpu_rate
+
+    @property
+    def name(self):
+        return f"{self.profile}-cpu{self.cpu_rate}x"
+
+    def apply(self, driver):
+        settings = PROFILES[self.profile]
+        conditions = {
+            "offline": False,
+            "latency": settings["latency"],
+            "downloadThroughput": settings["download"] * 1000 / 8,
+            "uploadThroughput": settings["upload"] * 1000 / 8,
+        }
+        if settings["packet_loss"]:
+            conditions["packetLoss"] = settings["packet_loss"]
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.emulateNetworkConditions", conditions)
+        driver.execute_cdp_cmd("Emulation.setCPUThrottlingRate", {"rate": self.cpu_rate})
+
+    @staticmethod
+    def reset(driver):
+        """Lift all emulation so a pooled browser goes back clean"""
+        driver.execute_cdp_cmd("Network.emulateNetworkConditions", {
+            "offline": False, "latency": 0, "downloadThroughput": -1, "uploadThroughput": -1,
+        })
+        driver.execute_cdp_cmd("Emulation.setCPUThrottlingRate", {"rate": 1})
+
+
+def matrix(profiles=None, cpu_rates=None):
+    return [NetworkCondition(profile, rate) for profile in profiles or PROFILES for rate in cpu_rates or CPU_RATES]
+
+
+def record_sample(condition, lang, query, **metrics):
+    with _samples_lock:
+        _samples.append(dict({key: metrics.get(key) for key in METRICS},
+                             condition=condition.name, lang=lang, query=query))
+
+
+def drain_samples():
+    with _samples_lock:
+        samples = list(_samples)
+        _samples.clear()
+    return samples
+
+
+def medians(samples):
+    """Median of every metric per matrix cell"""
+    values = defaultdict(lambda: defaultdict(list))
+    for sample in samples:
+        for metric in METRICS:
+            if sample.get(metric) is not None:
+                values[sample["condition"]][metric].append(sample[metric])
+    return {
+        condition: {metric: round(statistics.median(v), 3) for metric, v in by_metric.items()}
+        for condition, by_metric in values.items()
+    }
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    baseline = load_baseline(path)
+    baseline.update(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def regressions(results, baseline, margin=0.25, min_delta=0.2):
+    """Metrics that got slower than the baseline by more than `margin` (and `min_delta` seconds)"""
+    found = []
+    for condition, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(condition, {}).get(metric)
+            if reference is None:
+                continue
+            if value > reference * (1 + margin) and value - reference > min_delta:
+                found.append(f"{condition} {metric}: {value:.2f}s vs baseline {reference:.2f}s "
+                             f"(+{(value / reference - 1) if reference else float('inf'):.0%})")
+    return found
+
+
+def format_table(results, baseline):
+    """Comparison table of the matrix medians against the baseline"""
+    header = f"{'condition':<20}" + "".join(f"{metric:>28}" for metric in METRICS)
+    lines = [header, "-" * len(header)]
+    for condition in sorted(results):
+        cells = []
+        for metric in METRICS:
+            value = results[condition].get(metric)
+            reference = baseline.get(condition, {}).get(metric)
+            if value is None:
+                cells.append(f"{'-':>28}")
+            elif reference:
+                cells.append(f"{f'{value:.2f}s ({reference:.2f}s, {value / reference - 1:+.0%})':>28}")
+            else:
+                cells.append(f"{f'{value:.2f}s':>28}")
+        lines.append(f"{condition:<20}" + "".join(cells))
+    return "\n".join(lines)
+
+
+class NetworkMatrixPlugin:
+    """
+    Moves the samples of each test into its report, aggregates them on the
+    controlling process, prints the comparison table and fails the session when
+    a cell regressed past the baseline. With `update` the baseline is rewritten.
+    """
+
+    def __init__(self, config, baseline_path=DEFAULT_BASELINE, margin=0.25, update=False):
+        self.config = config
+        self.baseline_path = baseline_path
+        self.margin = margin
+        self.update = update
+        self.samples = []
+        self.results = {}
+        self.baseline = {}
+        self.regressions = []
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        if call.when == "call":
+            outcome.get_result().network_samples = drain_samples()
+
+    def pytest_runtest_logreport(self, report):
+        self.samples.extend(getattr(report, "network_samples", ()))
+
+    def pytest_sessionfinish(self, session):
+        if hasattr(self.config, "workerinput") or not self.samples:
+            return
+        self.results = medians(self.samples)
+        self.baseline = load_baseline(self.baseline_path)
+        if self.update or not self.baseline:
+            save_baseline(self.results, self.baseline_path)
+            return
+        self.regressions = regressions(self.results, self.baseline, self.margin)
+        if self.regressions and session.exitstatus == 0:
+            session.exitstatus = 1
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if not self.results:
+            return
+        terminalreporter.write_sep("-", "network matrix (median)")
+        terminalreporter.write_line(format_table(self.results, self.baseline))
+        if self.update or not self.baseline:
+            terminalreporter.write_line(f"Baseline written to {self.baseline_path}")
+        for regression in self.regressions:
+            terminalreporter.write_line(f"REGRESSION {regression}", red=True)
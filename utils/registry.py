@@ -0,0 +1,135 @@
+import json
+import os
+import zlib
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, NamedTuple, Tuple
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "../data")
+LOCATORS_PATH = os.path.join(DATA_DIR, "locators.json")
+TEST_DATA_PATH = os.path.join(DATA_DIR, "test-data.json")
+
+# Every key the suite reads, checked once when the registry is first loaded
+REQUIRED_LOCATORS = {
+    "home_page": ("accept_button", "chat_input_box", "language_button"),
+    "chat_widget": (
+        "widget_container", "input_field", "send_button", "message_container", "new_session_button",
+        "ai_message", "ai_message_rtl", "loading_spinner", "error_message", "ok_button", "captcha_blocker",
+    ),
+}
+REQUIRED_TEST_DATA = (
+    "ui_tests.language_direction",
+    "ui_tests.test_messages.input_field_test.message",
+    "ui_tests.test_messages.input_field_test.expected_keyword",
+    "response_validation.common_queries",
+    "security_tests.xss_attempts",
+    "security_tests.xss_expected_strings",
+    "security_tests.malicious_prompts",
+    "security_tests.expected_rejection_phrases",
+)
+
+
+class RegistryError(ValueError):
+    """Raised when a data file is missing keys the tests rely on"""
+
+
+class CorpusQuery(NamedTuple):
+    query: str
+    lang: str
+    expected_keywords: Tuple[str, ...]
+
+
+def freeze(value: Any) -> Any:
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _read_json(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _lookup(data: Mapping, dotted: str) -> Any:
+    for part in dotted.split("."):
+        data = data[part]
+    return data
+
+
+def validate_locators(data: Mapping) -> None:
+    missing = [
+        f"{section}.{name}"
+        for section, names in REQUIRED_LOCATORS.items()
+        for name in names
+        if not isinstance(data.get(section), Mapping) or not data[section].get(name)
+    ]
+    if missing:
+        raise RegistryError(f"locators.json is missing: {', '.join(missing)}")
+
+
+def validate_test_data(data: Mapping) -> None:
+    missing = []
+    for dotted in REQUIRED_TEST_DATA:
+        try:
+            _lookup(data, dotted)
+        except (KeyError, TypeError):
+            missing.append(dotted)
+    for index, query_data in enumerate(data.get("response_validation", {}).get("common_queries", ())):
+        for key in ("en", "ar", "expected_keywords.en", "expected_keywords.ar"):
+            try:
+                _lookup(query_data, key)
+            except (KeyError, TypeError):
+                missing.append(f"response_validation.common_queries[{index}].{key}")
+    if missing:
+        raise RegistryError(f"test-data.json is missing: {', '.join(missing)}")
+
+
+@lru_cache(maxsize=None)
+def get_locators() -> Mapping[str, Mapping[str, str]]:
+    """Parsed, validated and frozen data/locators.json (parsed once per process)"""
+    data = _read_json(LOCATORS_PATH)
+    validate_locators(data)
+    return freeze(data)
+
+
+@lru_cache(maxsize=None)
+def get_test_data() -> Mapping[str, Any]:
+    """Parsed, validated and frozen data/test-data.json (parsed once per process)"""
+    data = _read_json(TEST_DATA_PATH)
+    validate_test_data(data)
+    return freeze(data)
+
+
+def iter_corpus(path: str) -> Iterator[CorpusQuery]:
+    """
+    Stream a JSON Lines query corpus without loading it, one
+    {"query": ..., "lang": ..., "expected_keywords": [...]} object per line.
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield CorpusQuery(record["query"], record.get("lang", "en"),
+                              tuple(record.get("expected_keywords", ())))
+
+
+def shard_of(query: CorpusQuery, shard_count: int) -> int:
+    """Stable shard index of a query, independent of its position in the file"""
+    return zlib.crc32(f"{query.lang}\0{query.query}".encode("utf-8")) % shard_count
+
+
+def iter_shard(path: str, shard_index: int, shard_count: int) -> Iterator[CorpusQuery]:
+    """Stream only the queries of one shard"""
+    for query in iter_corpus(path):
+        if shard_of(query, shard_count) == shard_index:
+            yield query
+
+
+# Fail at import rather than half-way through a run
+get_locators()
+get_test_data()
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from utils.result_sink import file_lock, write_json_atomic
+
+
+MODES = ("off", "record", "replay", "refresh")
+# Sent by API clients that already looked the query up, so the stand-in does not look it up again
+CHECKED_HEADER = "X-UAsk-Cache-Checked"
+LOCATORS_PATH = os.path.join(os.path.dirname(__file__), "../data/locators.json")
+
+
+def locator_version(path=LOCATORS_PATH):
+    """Short content hash of the locator file, so a selector change invalidates recordings"""
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+class ResponseCache:
+    """
+    Cassette-style cache of chatbot answers keyed by (query, lang, locator version).
+      record   ask the real bot and store every answer
+      replay   serve stored answers, ask the bot only on a miss
+      refresh  like replay, but re-record entries older than `ttl` seconds
+    Entries live in one JSON file each under `directory`, with an index holding
+    the LRU order; the least recently used entries are evicted past `max_entries`.
+    Parallel workers share the directory: save() merges this process's changes
+    into the index on disk under a lock instead of overwriting it. With `live`
+    False (answers come from the stand-in) nothing is ever recorded.
+    """
+
+    def __init__(self, directory=".cache/responses", mode="off", ttl=None, max_entries=5000, live=True):
+        if mode not in MODES:
+            raise ValueError(f"Unknown response cache mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.live = live
+        self.version = locator_version()
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = {}
+        self._touched = set()
+        self._removed = set()
+        self._dirty = False
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "recorded": 0, "evicted": 0}
+        if mode != "off" and os.path.exists(self._index_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                self._index = json.load(f)
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    @property
+    def recording(self):
+        return self.live and self.mode in ("record", "refresh")
+
+    def key(self, query, lang):
+        return hashlib.sha1(f"{self.version}\0{lang}\0{query}".encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def lookup(self, query, lang):
+        """Return the stored answer for replay, or None on a miss (always None in record mode)"""
+        if self.mode not in ("replay", "refresh"):
+            return None
+        key = self.key(query, lang)
+        with self._lock:
+            meta = self._index.get(key)
+            if meta is None:
+                self.stats["misses"] += 1
+                return None
+            if self.mode == "refresh" and self.ttl is not None and time.time() - meta["recorded_at"] > self.ttl:
+                self.stats["stale"] += 1
+                return None
+            meta["last_used"] = time.time()
+            self._touched.add(key)
+            self._dirty = True
+            self.stats["hits"] += 1
+        try:
+            with open(self._entry_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            with self._lock:
+                self._index.pop(key, None)
+                self._removed.add(key)
+                self.stats["hits"] -= 1
+                self.stats["misses"] += 1
+            return None
+
+    def wants(self, query, lang):
+        """
+        Whether an answer that could not be served from the cache (a live browser
+        answer) should be recorded: always in record mode, in refresh mode only
+        when the stored one is missing or stale.
+        """
+        if not self.recording:
+            return False
+        if self.mode == "record":
+            return True
+        with self._lock:
+            meta = self._index.get(self.key(query, lang))
+            if meta is None:
+                self.stats["misses"] += 1
+                return True
+            if self.ttl is not None and time.time() - meta["recorded_at"] > self.ttl:
+                self.stats["stale"] += 1
+                return True
+            self.stats["hits"] += 1
+            return False
+
+    def store(self, query, lang, text, html=None, events=None, latency=None):
+        """Record an answer when recording or refreshing"""
+        if not self.recording:
+            return
+        key = self.key(query, lang)
+        now = time.time()
+        entry = {"query": query, "lang": lang, "version": self.version, "recorded_at": now,
+                 "text": text, "html": html, "events": events or [], "latency": latency}
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(self._entry_path(key), entry)
+        with self._lock:
+            self._index[key] = {"query": query, "lang": lang, "recorded_at": now, "last_used": now}
+            self._touched.add(key)
+            self._removed.discard(key)
+            self.stats["recorded"] += 1
+            self._dirty = True
+            self._evict()
+
+    def _evict(self):
+        overflow = len(self._index) - self.max_entries
+        if overflow <= 0:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda item: item[1]["last_used"])[:overflow]:
+            del self._index[key]
+            self._touched.discard(key)
+            self._removed.add(key)
+            try:
+                os.remove(self._entry_path(key))
+            except FileNotFoundError:
+                pass
+            self.stats["evicted"] += 1
+
+    def save(self):
+        """
+        Merge this process's recordings, uses and removals into the index on
+        disk (LRU order and timestamps). Entries this process did not touch keep
+        their stored state, so other workers' recordings and evictions survive.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with file_lock(self._index_path + ".lock"):
+                stored = {}
+                if os.path.exists(self._index_path):
+                    with open(self._index_path, encoding="utf-8") as f:
+                        stored = json.load(f)
+                for key in self._removed:
+                    stored.pop(key, None)
+                for key in self._touched:
+                    meta, other = self._index[key], stored.get(key)
+                    if other is None or other["recorded_at"] <= meta["recorded_at"]:
+                        stored[key] = meta
+                    else:
+                        # Re-recorded by another worker since; keep it, with the later use
+                        other["last_used"] = max(other["last_used"], meta["last_used"])
+                self._index = stored
+                self._evict()
+                write_json_atomic(self._index_path, self._index)
+            self._touched.clear()
+            self._removed.clear()
+            self._dirty = False
+
+    def report(self):
+        total = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+        hit_rate = self.stats["hits"] / total if total else 0.0
+        return (
+            f"Response cache ({self.mode}): {self.stats['hits']} hits, {self.stats['misses']} misses, "
+            f"{self.stats['stale']} stale ({hit_rate:.0%} hit rate), {self.stats['recorded']} recorded, "
+            f"{self.stats['evicted']} evicted, {len(self._index)} entries"
+        )
+
+
+_cache = None
+
+
+def configure_response_cache(**options):
+    global _cache
+    _cache = ResponseCache(**options)
+    return _cache
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
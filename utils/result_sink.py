@@ -0,0 +1,256 @@
+import argparse
+import atexit
+import html
+import json
+import os
+import queue
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from utils.timeline import format_timeline
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_PATH = "logs/validation.jsonl"
+LEGACY_SEPARATOR = "\n" + "-" * 60 + "\n"
+LEGACY_FIELD = re.compile(r"^(Timestamp|Language|Query|Status|AI Full Response|Timeline|Screenshot|Failure Reasons)\s*:(.*)$")
+
+
+def write_json_atomic(path, data):
+    """Write JSON through a temporary file so readers never see a half-written file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def file_lock(lock_path):
+    """Exclusive inter-process lock held on a side file while a batch is written"""
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ResultSink:
+    """
+    Collects validation records on a queue and appends them to a JSON Lines file
+    from a background thread in batches. Appends are serialized across processes
+    with a lock file and the file is rotated once it grows past `max_bytes`.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=20 * 1024 * 1024, backups=5,
+                 batch_size=200, flush_interval=0.5, console=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.console = console
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name="result-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        """Queue a record; never blocks on disk"""
+        self._queue.put(record)
+        if self.console:
+            print(console_summary(record))
+
+    def flush(self):
+        """Block until everything emitted so far is on disk"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, waiters, stop = [], [], False
+            while True:
+                if item is self._stop:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=self.flush_interval if batch and not waiters else 0)
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write(batch)
+            except Exception as e:
+                # Keep the writer alive: a dead thread would leave flush() and close() waiting forever
+                self.errors += len(batch)
+                print(f"Result sink: could not write {len(batch)} records to {self.path}: {e}", file=sys.stderr)
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        data = "".join(json.dumps(record, ensure_ascii=False, default=_jsonable) + "\n" for record in batch).encode("utf-8")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with file_lock(self.path + ".lock"):
+            try:
+                if os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+            except FileNotFoundError:
+                pass
+            with open(self.path, "ab") as f:
+                f.write(data)
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def _jsonable(value):
+    """Fallback for values json cannot encode (sets from callers, exceptions, paths)"""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+def console_summary(record):
+    """One line per result for the opt-in console output"""
+    line = f"[{record['status']}] {record['lang'].upper()} {record['query'][:80]}"
+    if record.get("failure_reasons"):
+        line += f" -- {', '.join(record['failure_reasons'])}"
+    return line
+
+
+def render_legacy(record):
+    """Render a record in the original logs/validation.log text format"""
+    entry = (
+        f"{LEGACY_SEPARATOR}"
+        f"Timestamp       : {record['timestamp']}\n"
+        f"Language        : {record['lang'].upper()}\n"
+        f"Query           : {html.escape(record['query'][:200])}\n"
+        f"Status          : {record['status']}\n"
+        f"AI Full Response:\n{html.escape(record['response'])}\n"
+    )
+    if record.get("timeline"):
+        entry += f"Timeline        : {format_timeline(record['timeline'])}\n"
+    if record.get("screenshot"):
+        entry += f"Screenshot      : {record['screenshot']}\n"
+    if record["status"] != "PASS":
+        entry += f"Failure Reasons : {', '.join(record.get('failure_reasons') or [])}\n"
+    return entry
+
+
+def parse_legacy(block):
+    """Record from one entry of the legacy text format (the inverse of render_legacy), or None"""
+    record, response, in_response = {}, [], False
+    for line in block.splitlines():
+        match = LEGACY_FIELD.match(line)
+        if match:
+            name, value = match.group(1), match.group(2).strip()
+            in_response = name == "AI Full Response"
+            if not in_response:
+                record[name.lower().replace(" ", "_")] = value
+        elif in_response:
+            response.append(line)
+    if "query" not in record or "status" not in record:
+        return None
+    reasons = record.get("failure_reasons")
+    return {
+        "timestamp": record.get("timestamp"),
+        "lang": record.get("language", "").lower(),
+        "query": html.unescape(record["query"]),
+        "status": record["status"],
+        "failure_reasons": [reason.strip() for reason in reasons.split(", ")] if reasons else [],
+        "response": html.unescape("\n".join(response).strip()),
+        "screenshot": record.get("screenshot"),
+    }
+
+
+def read_records(path=DEFAULT_PATH):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+_default_sink = None
+_default_lock = threading.Lock()
+
+
+def configure_sink(**options):
+    """Replace the process-wide sink, e.g. to enable console output"""
+    global _default_sink
+    with _default_lock:
+        if _default_sink is not None:
+            _default_sink.close()
+        _default_sink = ResultSink(**options)
+    return _default_sink
+
+
+def get_sink():
+    global _default_sink
+    with _default_lock:
+        if _default_sink is None:
+            _default_sink = ResultSink(console=os.environ.get("UASK_CONSOLE_RESULTS") == "1")
+        return _default_sink
+
+
+@atexit.register
+def _close_default_sink():
+    if _default_sink is not None:
+        _default_sink.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render structured validation results as the legacy text log")
+    parser.add_argument("path", nargs="?", default=DEFAULT_PATH, help="JSON Lines results file")
+    parser.add_argument("-o", "--output", help="Write to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in read_records(args.path):
+            out.write(render_legacy(record))
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
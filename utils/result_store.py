@@ -0,0 +1,335 @@
+import argparse
+import difflib
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from utils.result_sink import DEFAULT_PATH, LEGACY_SEPARATOR, parse_legacy
+
+
+DEFAULT_DB = "logs/results.db"
+# Only the results file: the legacy log rendered from it by `python -m utils.result_sink`
+# holds the same records, so it is ingested only when named (e.g. a log from before the sink)
+DEFAULT_SOURCES = (DEFAULT_PATH,)
+# Entries without a run id start a new run after this many seconds of silence
+RUN_GAP = 30 * 60
+HEAD_BYTES = 4096
+CHUNK_BYTES = 1 << 20
+PERIODS = {"day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    run TEXT,
+    timestamp TEXT,
+    test TEXT,
+    lang TEXT,
+    query TEXT,
+    status TEXT,
+    failure_reasons TEXT,
+    response TEXT,
+    ttft REAL,
+    duration REAL,
+    screenshot TEXT,
+    UNIQUE (source, generation, offset)
+);
+CREATE INDEX IF NOT EXISTS results_timestamp ON results (timestamp);
+CREATE INDEX IF NOT EXISTS results_query ON results (lang, query, timestamp);
+CREATE INDEX IF NOT EXISTS results_status ON results (status, timestamp);
+CREATE INDEX IF NOT EXISTS results_run ON results (run);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    head TEXT,
+    generation INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    last_run TEXT,
+    last_timestamp TEXT
+);
+"""
+
+
+def _head(path, length=HEAD_BYTES):
+    """"<length>:<digest>" of the first bytes of a file, identifying it across appends but not rotation"""
+    with open(path, "rb") as f:
+        data = f.read(length)
+    return f"{len(data)}:{hashlib.sha1(data).hexdigest()}"
+
+
+def _same_file(path, head):
+    """Whether a file still starts with the bytes a stored head was taken from"""
+    return _head(path, int(head.split(":", 1)[0])) == head
+
+
+def _segments(f, separator, final_complete):
+    """
+    Yield (offset, bytes, end) for every complete entry after the current file
+    position, reading in chunks. The data after the last separator counts as
+    complete only at end of file and when `final_complete` accepts it.
+    """
+    offset = f.tell()
+    buffer = b""
+    while True:
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            break
+        buffer += chunk
+        parts = buffer.split(separator)
+        buffer = parts.pop()
+        for part in parts:
+            end = offset + len(part) + len(separator)
+            yield offset, part, end
+            offset = end
+    if buffer and final_complete(buffer):
+        yield offset, buffer, offset + len(buffer)
+
+
+def _parse_time(timestamp):
+    try:
+        return datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+class ResultStore:
+    """
+    SQLite index over validation results. Sources (JSON Lines result files and
+    legacy text logs) are ingested incrementally from the byte offset reached
+    last time, in transactions that commit rows and offset together, so an
+    interrupted ingestion resumes where it stopped and a re-run only reads new
+    data. A rotated result file is detected by the digest of its first bytes;
+    its rest is read from the `.1` backup and the new file starts a new generation.
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _state(self, path):
+        row = self.db.execute("SELECT * FROM sources WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row else {"path": path, "head": None, "generation": 0, "offset": 0, "last_run": None, "last_timestamp": None}
+
+    def ingest(self, path, batch_size=5000):
+        """Add the entries appended to a source since the last ingestion; returns the number of new rows"""
+        if not os.path.exists(path):
+            return 0
+        key = os.path.abspath(path)
+        state = self._state(key)
+        added = 0
+        if state["head"] is not None and (not _same_file(path, state["head"]) or os.path.getsize(path) < state["offset"]):
+            # Rotated by the result sink: finish the old file under its new name, then start over
+            rotated = f"{path}.1"
+            if os.path.exists(rotated) and _same_file(rotated, state["head"]):
+                added += self._ingest_file(rotated, state, batch_size)
+            state["generation"] += 1
+            state["offset"] = 0
+        state["head"] = _head(path)
+        return added + self._ingest_file(path, state, batch_size)
+
+    def _ingest_file(self, path, state, batch_size):
+        legacy = ".jsonl" not in os.path.basename(path)
+        if legacy:
+            separator, final_complete = LEGACY_SEPARATOR.encode("utf-8"), lambda data: data.endswith(b"\n")
+        else:
+            separator, final_complete = b"\n", lambda data: False
+        rows, added = [], 0
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            for offset, data, end in _segments(f, separator, final_complete):
+                state["offset"] = end
+                text = data.decode("utf-8", errors="replace")
+                if not text.strip():
+                    continue
+                record = parse_legacy(text) if legacy else json.loads(text)
+                if record is None:
+                    continue
+                rows.append(self._row(state, offset, record))
+                if len(rows) >= batch_size:
+                    added += self._commit(rows, state)
+                    rows = []
+        return added + self._commit(rows, state)
+
+    def _row(self, state, offset, record):
+        run = record.get("run")
+        if run is None:
+            # Older entries carry no run id: a long enough pause starts a new run
+            current, previous = _parse_time(record.get("timestamp")), _parse_time(state["last_timestamp"])
+            if state["last_run"] is None or current is None or previous is None or \
+                    (current - previous).total_seconds() > RUN_GAP:
+                state["last_run"] = f"run-{record.get('timestamp') or offset}"
+            run = state["last_run"]
+        else:
+            state["last_run"] = run
+        state["last_timestamp"] = record.get("timestamp") or state["last_timestamp"]
+        timeline = record.get("timeline") or {}
+        return (
+            state["path"], state["generation"], offset, run, record.get("timestamp"), record.get("test"), record.get("lang"), record.get("query"),
+            record.get("status"), json.dumps(record.get("failure_reasons") or [], ensure_ascii=False),
+            record.get("response"), timeline.get("ttft"), timeline.get("duration"), record.get("screenshot"),
+        )
+
+    def _commit(self, rows, state):
+        with self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                "INSERT OR IGNORE INTO results (source, generation, offset, run, timestamp, test, lang, query, status, "
+                "failure_reasons, response, ttft, duration, screenshot) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = self.db.total_changes - before
+            self.db.execute(
+                "INSERT OR REPLACE INTO sources (path, head, generation, offset, last_run, last_timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (state["path"], state["head"], state["generation"], state["offset"], state["last_run"],
+                 state["last_timestamp"]),
+            )
+        return added
+
+    def runs(self):
+        return self.db.execute(
+            "SELECT run, MIN(timestamp) AS started, COUNT(*) AS results, SUM(status = 'PASS') AS passed "
+            "FROM results GROUP BY run ORDER BY started"
+        ).fetchall()
+
+    def trend(self, query=None, lang=None, period="week", since=None):
+        """Pass rate and latency per period, optionally for the queries containing `query`"""
+        where, params = ["1 = 1"], [PERIODS[period]]
+        if query:
+            where.append("query LIKE ?")
+            params.append(f"%{query}%")
+        if lang:
+            where.append("lang = ?")
+            params.append(lang)
+        if since:
+            where.append("timestamp >= ?")
+            params.append(since)
+        return self.db.execute(
+            "SELECT strftime(?, timestamp) AS period, lang, COUNT(*) AS results, "
+            "AVG(status = 'PASS') AS pass_rate, AVG(ttft) AS ttft, AVG(duration) AS duration "
+            f"FROM results WHERE {' AND '.join(where)} GROUP BY period, lang ORDER BY period, lang",
+            params,
+        ).fetchall()
+
+    def flaky(self, min_results=3, since=None):
+        """Queries that both passed and failed, with how often their status flipped from one result to the next"""
+        return self.db.execute(
+            """
+            SELECT lang, query, COUNT(*) AS results, SUM(status = 'PASS') AS passed,
+                   SUM(flipped) AS flips, MAX(timestamp) AS last_seen
+            FROM (
+                SELECT lang, query, status, timestamp,
+                       status != LAG(status) OVER (PARTITION BY lang, query ORDER BY timestamp, id) AS flipped
+                FROM results WHERE timestamp >= ?
+            )
+            GROUP BY lang, query
+            HAVING results >= ? AND passed > 0 AND passed < results
+            ORDER BY flips DESC, results DESC
+            """,
+            (since or "", min_results),
+        ).fetchall()
+
+    def drift(self, run_a, run_b, threshold=0.8):
+        """Queries answered in both runs whose response similarity dropped below `threshold`"""
+        def answers(run):
+            rows = self.db.execute(
+                "SELECT lang, query, status, response, duration FROM results WHERE run = ? ORDER BY timestamp, id",
+                (run,),
+            )
+            return {(row["lang"], row["query"]): row for row in rows}
+
+        before, after = answers(run_a), answers(run_b)
+        drifted = []
+        for key in sorted(before.keys() & after.keys()):
+            old, new = before[key], after[key]
+            similarity = difflib.SequenceMatcher(None, old["response"] or "", new["response"] or "").ratio()
+            if similarity < threshold or old["status"] != new["status"]:
+                drifted.append({"lang": key[0], "query": key[1], "similarity": round(similarity, 3),
+                                "before": old, "after": new})
+        return drifted
+
+
+def ingest_all(db=DEFAULT_DB, sources=DEFAULT_SOURCES):
+    store = ResultStore(db)
+    try:
+        return sum(store.ingest(source) for source in sources)
+    finally:
+        store.close()
+
+
+def _rate(value):
+    return "-" if value is None else f"{value:.0%}"
+
+
+def _seconds(value):
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index validation results in SQLite and query their history")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Add new entries of result files and legacy logs")
+    ingest.add_argument("sources", nargs="*", default=list(DEFAULT_SOURCES))
+    commands.add_parser("runs", help="List the runs in the store")
+    trend = commands.add_parser("trend", help="Pass rate and latency over time")
+    trend.add_argument("--query", help="Only queries containing this text")
+    trend.add_argument("--lang")
+    trend.add_argument("--period", choices=PERIODS, default="week")
+    trend.add_argument("--since", help="e.g. 2025-03-01")
+    flaky = commands.add_parser("flaky", help="Queries that both pass and fail")
+    flaky.add_argument("--min-results", type=int, default=3)
+    flaky.add_argument("--since")
+    drift = commands.add_parser("drift", help="Responses that changed between two runs (default the last two)")
+    drift.add_argument("runs", nargs="*")
+    drift.add_argument("--threshold", type=float, default=0.8)
+    drift.add_argument("--diff", action="store_true", help="Print a unified diff of each drifted response")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.db)
+    try:
+        if args.command == "ingest":
+            for source in args.sources:
+                print(f"{source}: {store.ingest(source)} new results")
+        elif args.command == "runs":
+            for row in store.runs():
+                print(f"{row['run']:<32} {row['started']}  {row['results']:>5} results  "
+                      f"{_rate(row['passed'] / row['results'])} passed")
+        elif args.command == "trend":
+            print(f"{'period':<10} {'lang':<5} {'results':>8} {'pass rate':>10} {'ttft':>8} {'duration':>9}")
+            for row in store.trend(args.query, args.lang, args.period, args.since):
+                print(f"{row['period'] or '-':<10} {row['lang'] or '-':<5} {row['results']:>8} "
+                      f"{_rate(row['pass_rate']):>10} {_seconds(row['ttft']):>8} {_seconds(row['duration']):>9}")
+        elif args.command == "flaky":
+            for row in store.flaky(args.min_results, args.since):
+                print(f"[{(row['lang'] or '-').upper()}] {row['query'][:70]}: {row['passed']}/{row['results']} passed, "
+                      f"{row['flips']} flips, last {row['last_seen']}")
+        elif args.command == "drift":
+            runs = args.runs or [row["run"] for row in store.runs()][-2:]
+            if len(runs) != 2:
+                parser.error("drift needs two runs")
+            for item in store.drift(runs[0], runs[1], args.threshold):
+                before, after = item["before"], item["after"]
+                print(f"[{item['lang'].upper()}] {item['query'][:70]}: similarity {item['similarity']}, "
+                      f"{before['status']} -> {after['status']}, "
+                      f"{_seconds(before['duration'])} -> {_seconds(after['duration'])}")
+                if args.diff:
+                    print("\n".join(difflib.unified_diff(
+                        (before["response"] or "").splitlines(), (after["response"] or "").splitlines(),
+                        runs[0], runs[1], lineterm="")))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import base64
+import hashlib
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from selenium.common.exceptions import WebDriverException
+
+
+MODES = ("always", "on-failure", "ring")
+
+
+def grab_frame(driver):
+    """Raw base64 PNG of the viewport, asking Chrome for its fastest encoder when available"""
+    try:
+        return driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "png", "optimizeForSpeed": True})["data"]
+    except (AttributeError, WebDriverException):
+        return driver.get_screenshot_as_base64()
+
+
+def _write_frame(path, data):
+    with open(path, "wb") as f:
+        f.write(base64.b64decode(data))
+
+
+class ScreenshotService:
+    """
+    Takes screenshots without blocking the test on decoding and disk writes.
+    Identical frames are written once. Modes:
+      always      write every capture
+      on-failure  only capture when a test fails
+      ring        keep the last `ring_size` frames in memory, write them when a test fails
+    """
+
+    def __init__(self, folder="screenshots", mode="always", ring_size=5, workers=2):
+        if mode not in MODES:
+            raise ValueError(f"Unknown screenshot mode: {mode}")
+        self.folder = folder
+        self.mode = mode
+        self.ring = deque(maxlen=ring_size)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshot")
+        self._lock = threading.Lock()
+        self._written = {}
+        self._paths = set()
+        self.stats = {"captured": 0, "written": 0, "duplicates": 0}
+
+    def _path_for(self, test_name):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.folder, f"{test_name}_{timestamp}.png")
+        counter = 2
+        while path in self._paths:
+            path = os.path.join(self.folder, f"{test_name}_{timestamp}_{counter}.png")
+            counter += 1
+        self._paths.add(path)
+        return path
+
+    def _store(self, test_name, data):
+        """Schedule a frame for writing, returning the path of the file holding it"""
+        digest = hashlib.sha1(data.encode("ascii")).hexdigest()
+        with self._lock:
+            if digest in self._written:
+                self.stats["duplicates"] += 1
+                return self._written[digest]
+            path = self._path_for(test_name)
+            self._written[digest] = path
+            self.stats["written"] += 1
+        os.makedirs(self.folder, exist_ok=True)
+        self._executor.submit(_write_frame, path, data)
+        return path
+
+    def capture(self, driver, test_name):
+        """Capture the page; returns the screenshot path, or None when nothing is written yet"""
+        if self.mode == "on-failure":
+            return None
+        data = grab_frame(driver)
+        with self._lock:
+            self.stats["captured"] += 1
+        if self.mode == "ring":
+            self.ring.append((test_name, data))
+            return None
+        return self._store(test_name, data)
+
+    def test_started(self):
+        self.ring.clear()
+
+    def test_failed(self, driver, test_name):
+        """Persist the evidence for a failed test and return the written paths"""
+        paths = []
+        if self.mode == "ring":
+            paths = [self._store(name, data) for name, data in self.ring]
+            self.ring.clear()
+        if self.mode != "always" and driver is not None:
+            try:
+                safe_name = re.sub(r"[^\w.-]+", "_", test_name)
+                paths.append(self._store(f"failure_{safe_name}", grab_frame(driver)))
+            except WebDriverException:
+                pass
+        return paths
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+_service = None
+
+
+def configure_screenshots(**options):
+    global _service
+    if _service is not None:
+        _service.close()
+    _service = ScreenshotService(**options)
+    return _service
+
+
+def get_screenshot_service():
+    global _service
+    if _service is None:
+        _service = ScreenshotService()
+    return _service
@@ -0,0 +1,275 @@
+import argparse
+import os
+import threading
+import time
+import numpy as np
+from utils.matching import normalize
+from utils.result_sink import LEGACY_SEPARATOR, ResultSink, parse_legacy, read_records
+
+
+DEFAULT_REFERENCES = ("logs/validation.jsonl",)
+DEFAULT_OUTPUT = "logs/semantic_scores.jsonl"
+DEFAULT_THRESHOLD = 0.3
+NGRAM_SIZES = (3, 4)
+HASH_PRIME = np.uint64(0x100000001B3)
+HASH_BITS = np.uint64(40)
+HASH_MASK = np.uint64((1 << 40) - 1)
+
+
+def read_legacy_log(path):
+    """Yield the entries of the original logs/validation.log text format as records"""
+    with open(path, encoding="utf-8") as f:
+        blocks = f.read().split(LEGACY_SEPARATOR)
+    for block in blocks:
+        record = parse_legacy(block)
+        if record is not None:
+            yield record
+
+
+def load_references(paths=DEFAULT_REFERENCES):
+    """PASS entries of JSON Lines result files and legacy .log files, usable as reference answers"""
+    references = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        records = read_records(path) if path.endswith(".jsonl") else read_legacy_log(path)
+        references.extend(
+            record for record in records
+            if record.get("status") == "PASS" and record.get("response") and record.get("query") not in ("", "N/A")
+        )
+    return references
+
+
+def _reference_key(query, lang):
+    return lang, normalize(query, lang)
+
+
+def _term_counts(texts, sizes=NGRAM_SIZES):
+    """
+    Character n-gram counts of every text in one vectorized pass.
+    Returns (doc, hash, count) arrays sorted by doc then hash.
+    """
+    if not texts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty.astype(np.uint64), empty
+    codes = np.frombuffer("\x00".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    separators = np.concatenate(([0], np.cumsum(codes == 0)))
+    keys = []
+    for n in sizes:
+        count = len(codes) - n + 1
+        if count <= 0:
+            continue
+        # Windows spanning a separator belong to two texts and are dropped
+        valid = separators[n:n + count] == separators[:count]
+        hashed = np.full(count, n, dtype=np.uint64)
+        for offset in range(n):
+            hashed = hashed * HASH_PRIME + codes[offset:offset + count]
+        # One sortable key per n-gram: the text index above a 40-bit hash
+        docs = separators[:count][valid].astype(np.uint64)
+        keys.append((docs << HASH_BITS) | (hashed[valid] >> np.uint64(64 - HASH_BITS)))
+    keys = np.sort(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.uint64)
+
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(starts, len(keys)))
+    keys = keys[starts]
+    return (keys >> HASH_BITS).astype(np.int64), keys & HASH_MASK, counts
+
+
+def _normalize_rows(docs, weights, doc_count):
+    norms = np.sqrt(np.bincount(docs, weights=weights * weights, minlength=doc_count))
+    norms[norms == 0] = 1.0
+    return weights / norms[docs]
+
+
+class ReferenceIndex:
+    """
+    TF-IDF index of character n-grams over reference answers. Responses are scored
+    in one batch by cosine similarity against the references recorded for the same
+    query and language (best match wins); responses without a reference score NaN.
+    References of the response's own run are skipped, so no answer is scored against itself.
+    """
+
+    def __init__(self, references):
+        self.references = list(references)
+        self._groups = {}
+        for ref_id, record in enumerate(self.references):
+            self._groups.setdefault(_reference_key(record["query"], record["lang"]), []).append(ref_id)
+
+        texts = [normalize(record["response"], record["lang"]) for record in self.references]
+        docs, hashes, counts = _term_counts(texts)
+        self.vocab, df = np.unique(hashes, return_counts=True)
+        doc_count = len(self.references)
+        self.idf = np.log((1 + doc_count) / (1 + df)) + 1
+        self.oov_idf = np.log(1 + doc_count) + 1
+
+        cols = np.searchsorted(self.vocab, hashes)
+        weights = _normalize_rows(docs, (1 + np.log(counts)) * self.idf[cols], doc_count)
+        # (reference, term) keys in ascending order, for vectorized sparse lookups
+        self._keys = docs * len(self.vocab) + cols
+        self._weights = weights
+
+    def __len__(self):
+        return len(self.references)
+
+    def score(self, records):
+        """Best cosine similarity of each record's response to its references, NaN when there are none"""
+        scores = np.full(len(records), np.nan)
+        pair_record, pair_ref = [], []
+        for index, record in enumerate(records):
+            run = record.get("run")
+            for ref_id in self._groups.get(_reference_key(record["query"], record["lang"]), ()):
+                if run is not None and self.references[ref_id].get("run") == run:
+                    continue
+                pair_record.append(index)
+                pair_ref.append(ref_id)
+        if not pair_record:
+            return scores
+        pair_record = np.array(pair_record)
+        pair_ref = np.array(pair_ref, dtype=np.int64)
+
+        texts = [normalize(record.get("response") or "", record["lang"]) for record in records]
+        docs, hashes, counts = _term_counts(texts)
+        cols = np.searchsorted(self.vocab, hashes).clip(max=max(len(self.vocab) - 1, 0))
+        in_vocab = self.vocab[cols] == hashes if len(self.vocab) else np.zeros(len(hashes), dtype=bool)
+        # Unknown n-grams add to the response norm but can never match a reference
+        idf = np.where(in_vocab, self.idf[cols] if len(self.vocab) else 0, self.oov_idf)
+        weights = _normalize_rows(docs, (1 + np.log(counts)) * idf, len(records))
+        docs, cols, weights = docs[in_vocab], cols[in_vocab], weights[in_vocab]
+        indptr = np.searchsorted(docs, np.arange(len(records) + 1))
+
+        # Expand every (response, reference) pair into the response's terms
+        lengths = indptr[pair_record + 1] - indptr[pair_record]
+        pair_of_term = np.repeat(np.arange(len(pair_record)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        terms = np.repeat(indptr[pair_record], lengths) + offsets
+
+        keys = pair_ref[pair_of_term] * len(self.vocab) + cols[terms]
+        found = np.searchsorted(self._keys, keys).clip(max=len(self._keys) - 1)
+        matched = self._keys[found] == keys
+        products = np.where(matched, self._weights[found] * weights[terms], 0.0)
+        pair_scores = np.bincount(pair_of_term, weights=products, minlength=len(pair_record))
+
+        best = np.full(len(records), -1.0)
+        np.maximum.at(best, pair_record, pair_scores)
+        scores[best >= 0] = best[best >= 0]
+        return scores
+
+
+def score_records(index, records, threshold=DEFAULT_THRESHOLD):
+    """Score records in one batch and return one result per record"""
+    records = list(records)
+    scores = index.score(records)
+    results = []
+    for record, score in zip(records, scores):
+        if np.isnan(score):
+            status, score = "NO_REFERENCE", None
+        else:
+            score = round(float(score), 4)
+            status = "PASS" if score >= threshold else "LOW"
+        results.append({
+            "timestamp": record.get("timestamp"),
+            "test": record.get("test"),
+            "lang": record["lang"],
+            "query": record["query"],
+            "validation_status": record.get("status"),
+            "score": score,
+            "threshold": threshold,
+            "status": status,
+        })
+    return results
+
+
+def summarize(results):
+    statuses = [result["status"] for result in results]
+    return (
+        f"Semantic scores: {statuses.count('PASS')} above threshold, {statuses.count('LOW')} below, "
+        f"{statuses.count('NO_REFERENCE')} without a reference answer"
+    )
+
+
+class SemanticScorer:
+    """
+    Collects the validation records of a run and scores them all at once when the
+    run ends, appending one result per record to `output`.
+    """
+
+    def __init__(self, references=DEFAULT_REFERENCES, threshold=DEFAULT_THRESHOLD,
+                 output=DEFAULT_OUTPUT, enabled=False):
+        self.references = tuple(references)
+        self.threshold = threshold
+        self.output = output
+        self.enabled = enabled
+        self.results = []
+        self.seconds = 0.0
+        self._records = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        if self.enabled:
+            with self._lock:
+                self._records.append(record)
+
+    def finish(self):
+        """Score everything collected so far and write the results"""
+        with self._lock:
+            records, self._records = self._records, []
+        if not records:
+            return []
+        started = time.perf_counter()
+        index = ReferenceIndex(load_references(self.references))
+        results = score_records(index, records, self.threshold)
+        self.seconds += time.perf_counter() - started
+        sink = ResultSink(path=self.output)
+        for result in results:
+            sink.emit(result)
+        sink.close()
+        self.results.extend(results)
+        return results
+
+    def report(self):
+        return f"{summarize(self.results)} (threshold {self.threshold}, scored in {self.seconds:.2f}s)"
+
+
+_scorer = None
+
+
+def configure_semantic(**options):
+    global _scorer
+    _scorer = SemanticScorer(**options)
+    return _scorer
+
+
+def get_semantic_scorer():
+    global _scorer
+    if _scorer is None:
+        _scorer = SemanticScorer()
+    return _scorer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score validation results against reference answers")
+    parser.add_argument("path", nargs="?", default="logs/validation.jsonl", help="JSON Lines results file")
+    parser.add_argument("-r", "--references", action="append",
+                        help=f"Reference results (.jsonl or legacy .log, repeatable), default {DEFAULT_REFERENCES[0]}")
+    parser.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("-o", "--output", help="Write the scores as JSON Lines to this file")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    index = ReferenceIndex(load_references(args.references or DEFAULT_REFERENCES))
+    results = score_records(index, read_records(args.path), args.threshold)
+    elapsed = time.perf_counter() - started
+
+    if args.output:
+        sink = ResultSink(path=args.output)
+        for result in results:
+            sink.emit(result)
+        sink.close()
+    for result in results:
+        if result["status"] == "LOW":
+            print(f"[LOW {result['score']:.2f}] {result['lang'].upper()} {result['query'][:80]}")
+    print(f"{summarize(results)}; {len(index)} references, {len(results)} responses in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
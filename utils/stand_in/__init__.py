@@ -0,0 +1 @@
+from utils.stand_in.server import StandInServer, pick_answer, load_answers
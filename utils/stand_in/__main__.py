@@ -0,0 +1,3 @@
+from utils.stand_in.server import main
+
+main()
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.response_cache import CHECKED_HEADER
+
+
+HERE = os.path.dirname(__file__)
+LANGUAGES = {"en": ("ltr", "ar"), "ar": ("rtl", "en")}
+
+
+def load_answers(path=None):
+    with open(path or os.path.join(HERE, "answers.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def render_page(lang, answers):
+    """Fill the page template for one language"""
+    with open(os.path.join(HERE, "page.html"), encoding="utf-8") as f:
+        page = f.read()
+    direction, other_lang = LANGUAGES[lang]
+    values = dict(answers["labels"][lang], lang=lang, dir=direction, other_lang=other_lang)
+    for key, value in values.items():
+        page = page.replace("{{" + key + "}}", value)
+    return page
+
+
+def pick_answer(answers, message, lang):
+    """Return the canned answer for a message, falling back to the template"""
+    normalized = message.lower()
+    rejections = answers["rejections"]
+    if any(pattern in normalized for pattern in rejections["match"]):
+        return rejections[lang]
+    for entry in answers["answers"]:
+        if any(pattern in normalized for pattern in entry["match"]):
+            return entry[lang]
+    return answers["fallback"][lang].replace("{query}", message)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server_version = "UAskStandIn/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].strip("/")
+        if path == "":
+            self.send_response(302)
+            self.send_header("Location", "/en/")
+            self.end_headers()
+        elif path in LANGUAGES:
+            self._send(200, render_page(path, self.server.answers), "text/html; charset=utf-8")
+        elif path == "captcha":
+            self._send(200, "<html><body>captcha</body></html>", "text/html; charset=utf-8")
+        elif path == "health":
+            self._send(200, "ok", "text/plain")
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/api/chat":
+            self._send(404, "not found", "text/plain")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        message = payload.get("message", "")
+        lang = payload.get("lang", "en") if payload.get("lang") in LANGUAGES else "en"
+        self.server.record_request(message, lang)
+        self.stream_answer(message, lang, replay=not self.headers.get(CHECKED_HEADER))
+
+    def stream_answer(self, message, lang, replay=True):
+        """
+        Stream the answer as newline-delimited JSON events. Browser requests are
+        answered from the replaying response cache when it has the query; API
+        clients have looked it up themselves (`replay` False).
+        """
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        time.sleep(server.latency)
+
+        roll = server.random.random()
+        if roll < server.captcha_rate:
+            events = [{"captcha": True}]
+        elif roll < server.captcha_rate + server.failure_rate:
+            events = [{"error": server.answers["failure"][lang]}]
+        else:
+            entry = server.response_cache.lookup(message, lang) if server.response_cache and replay else None
+            answer = entry["text"] if entry else pick_answer(server.answers, message, lang)
+            size = server.chunk_size
+            events = [{"delta": answer[i:i + size]} for i in range(0, len(answer), size)]
+
+        delay = server.chunk_size / server.chars_per_second if server.chars_per_second else 0
+        try:
+            for index, event in enumerate(events):
+                if index and delay:
+                    time.sleep(delay)
+                self.wfile.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b'{"done": true}\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Local replacement for ask.u.ae. Serves a chat page that matches every
+    selector in data/locators.json and answers from answers.json (or from a
+    replaying response cache) with configurable latency, streaming speed and
+    failure injection.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, chars_per_second=0,
+                 chunk_size=8, failure_rate=0.0, captcha_rate=0.0, seed=None,
+                 answers_path=None, response_cache=None, verbose=False):
+        super().__init__((host, port), StandInHandler)
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.chunk_size = chunk_size
+        self.failure_rate = failure_rate
+        self.captcha_rate = captcha_rate
+        self.random = random.Random(seed)
+        self.answers = load_answers(answers_path)
+        self.response_cache = response_cache
+        self.verbose = verbose
+        self.requests = []
+        self._requests_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def record_request(self, message, lang):
+        with self._requests_lock:
+            self.requests.append((message, lang))
+
+    def start(self):
+        """Serve in a daemon thread and return the root URL"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local U-Ask stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before the first chunk")
+    parser.add_argument("--chars-per-second", type=float, default=0, help="Streaming speed, 0 = instant")
+    parser.add_argument("--chunk-size", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--captcha-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = StandInServer(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        chars_per_second=args.chars_per_second,
+        chunk_size=args.chunk_size,
+        failure_rate=args.failure_rate,
+        captcha_rate=args.captcha_rate,
+        seed=args.seed,
+        verbose=True,
+    )
+    print(f"U-Ask stand-in serving on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
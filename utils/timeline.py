@@ -0,0 +1,65 @@
+import threading
+from collections import deque
+
+
+STALL_THRESHOLD = 0.5
+
+# Timelines captured during the current test, drained into the report by conftest.
+# Bounded so long runs outside pytest do not accumulate them.
+_recorded = deque(maxlen=100)
+_recorded_lock = threading.Lock()
+
+
+def timeline_metrics(events, stall_threshold=STALL_THRESHOLD, source=None):
+    """
+    Derive streaming metrics from (seconds_since_send, text_length) growth events:
+    time to first text, total duration, characters per second while streaming,
+    and gaps between growth events longer than `stall_threshold`. `source` ("api"
+    or "browser") tells later readers how the answer was received.
+    """
+    events = sorted(events)
+    if not events:
+        return {"ttft": None, "duration": None, "chars": 0, "chars_per_second": None,
+                "stalls": 0, "max_stall": 0.0, "stall_seconds": 0.0, "source": source}
+
+    ttft = events[0][0]
+    duration = events[-1][0]
+    chars = events[-1][1]
+    streaming = duration - ttft
+    gaps = [later[0] - earlier[0] for earlier, later in zip(events, events[1:])]
+    stalls = [gap for gap in gaps if gap > stall_threshold]
+    return {
+        "ttft": ttft,
+        "duration": duration,
+        "chars": chars,
+        "chars_per_second": chars / streaming if streaming > 0 else None,
+        "stalls": len(stalls),
+        "max_stall": max(stalls, default=0.0),
+        "stall_seconds": sum(stalls),
+        "source": source,
+    }
+
+
+def format_timeline(metrics):
+    """One-line summary used in the validation log and the HTML report"""
+    if not metrics or metrics.get("ttft") is None:
+        return "no streaming data"
+    rate = metrics["chars_per_second"]
+    rate_text = f"{rate:.1f} chars/s" if rate is not None else "single chunk"
+    return (
+        f"TTFT {metrics['ttft']:.2f}s, {rate_text}, "
+        f"{metrics['stalls']} stalls (max {metrics['max_stall']:.2f}s), total {metrics['duration']:.2f}s"
+    )
+
+
+def record_timeline(metrics):
+    with _recorded_lock:
+        _recorded.append(metrics)
+
+
+def drain_timelines():
+    """Return and forget the timelines recorded since the last call"""
+    with _recorded_lock:
+        timelines = list(_recorded)
+        _recorded.clear()
+    return timelines
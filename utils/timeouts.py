@@ -0,0 +1,195 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from utils.result_sink import read_records, write_json_atomic
+
+
+DEFAULT_PATH = ".cache/timeouts.json"
+
+# Deadlines used until an operation has enough recorded samples
+DEFAULTS = {
+    "disclaimer": 10,
+    "chat_ready": 10,
+    "language_switch": 30,
+    "input": 30,
+    "response": 60,
+}
+
+
+class CaptchaBlocked(AssertionError):
+    """The captcha blocker appeared while waiting; raised at once instead of timing out"""
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class TimeoutPolicy:
+    """
+    Rolling browser-wait latency samples per site, operation and language,
+    persisted between runs.
+    The deadline of a wait is the `pct` percentile of its last `window` samples
+    times `factor`, kept between `floor` and `cap` seconds. Operations with fewer
+    than `min_samples` samples use their entry in DEFAULTS (also capped).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, pct=95, factor=2.0, floor=5.0, cap=90.0,
+                 window=200, min_samples=5, adaptive=True, site="default"):
+        self.path = path
+        self.site = site
+        self.pct = pct
+        self.factor = factor
+        self.floor = floor
+        self.cap = cap
+        self.window = window
+        self.min_samples = min_samples
+        self.adaptive = adaptive
+        self.paused = False
+        self._samples = {}
+        self._new = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for key, samples in json.load(f).items():
+                    if key.startswith(f"{site}/"):
+                        self._samples[key] = deque(samples, maxlen=window)
+
+    def key(self, operation, lang):
+        return f"{self.site}/{operation}:{lang}"
+
+    def record(self, operation, lang, seconds):
+        """Add the latency of a wait that succeeded"""
+        if self.paused:
+            return
+        key = self.key(operation, lang)
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(round(seconds, 3))
+            self._new.setdefault(key, []).append(round(seconds, 3))
+
+    def seed_from_results(self, path):
+        """
+        Seed empty response stats from the browser timelines this site logged to
+        a results file. Seeded samples only steer this run, save() skips them.
+        """
+        if not os.path.exists(path):
+            return
+        seeded = set()
+        for record in read_records(path):
+            timeline = record.get("timeline") or {}
+            if timeline.get("source") != "browser" or record.get("site") != self.site:
+                continue
+            duration = timeline.get("duration")
+            key = self.key("response", record.get("lang"))
+            if duration is None:
+                continue
+            if key not in seeded and len(self._samples.get(key, ())) >= self.min_samples:
+                continue
+            seeded.add(key)
+            with self._lock:
+                self._samples.setdefault(key, deque(maxlen=self.window)).append(round(duration, 3))
+
+    def timeout(self, operation, lang="en"):
+        """Deadline in seconds for one wait"""
+        if self.paused:
+            return self.cap
+        default = min(DEFAULTS.get(operation, self.cap), self.cap)
+        if not self.adaptive:
+            return default
+        with self._lock:
+            samples = list(self._samples.get(self.key(operation, lang), ()))
+        if len(samples) < self.min_samples:
+            return default
+        return min(self.cap, max(self.floor, percentile(samples, self.pct) * self.factor))
+
+    @contextmanager
+    def pause(self):
+        """Deliberately slowed waits (e.g. throttled networks): use the cap and record nothing"""
+        self.paused = True
+        try:
+            yield
+        finally:
+            self.paused = False
+
+    def save(self):
+        """Merge this run's samples into the stats file"""
+        if not self.path:
+            return
+        with self._lock:
+            new, self._new = self._new, {}
+        if not new:
+            return
+        stored = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        # Keys without a site predate per-site stats and would never be read again
+        stored = {key: samples for key, samples in stored.items() if "/" in key}
+        for key, samples in new.items():
+            stored[key] = (stored.get(key, []) + samples)[-self.window:]
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_json_atomic(self.path, stored)
+
+    def report(self):
+        with self._lock:
+            keys = sorted(self._samples)
+        parts = [f"{key.split('/', 1)[1]} {self.timeout(*key.split('/', 1)[1].split(':', 1)):.1f}s" for key in keys]
+        return f"Adaptive timeouts ({self.site}): " + (", ".join(parts) if parts else "no history yet, using defaults")
+
+
+def captcha_visible(driver, selector):
+    """
+    Whether a captcha frame is actually shown. Invisible reCAPTCHA frames sit on
+    ordinary pages (hidden or zero-sized) and must not count as a blocker.
+    """
+    return any(frame.is_displayed() and frame.size["width"] and frame.size["height"]
+               for frame in driver.find_elements(By.CSS_SELECTOR, selector))
+
+
+def wait_until(driver, locators, operation, condition, lang="en", timeout=None):
+    """
+    WebDriverWait.until with the policy's deadline for `operation` that raises
+    CaptchaBlocked as soon as the captcha blocker is shown. The latency of
+    a successful wait is recorded for later runs.
+    """
+    policy = get_timeout_policy()
+    if timeout is None:
+        timeout = policy.timeout(operation, lang)
+    captcha = locators["chat_widget"]["captcha_blocker"]
+
+    def check(driver):
+        if captcha_visible(driver, captcha):
+            raise CaptchaBlocked(f"Captcha shown while waiting for {operation}")
+        return condition(driver)
+    functools.update_wrapper(check, condition)
+
+    started = time.perf_counter()
+    result = WebDriverWait(driver, timeout).until(check)
+    policy.record(operation, lang, time.perf_counter() - started)
+    return result
+
+
+_policy = None
+
+
+def configure_timeout_policy(**options):
+    global _policy
+    _policy = TimeoutPolicy(**options)
+    return _policy
+
+
+def get_timeout_policy():
+    global _policy
+    if _policy is None:
+        _policy = TimeoutPolicy(path=None, adaptive=False)
+    return _policy
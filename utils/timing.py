@@ -0,0 +1,274 @@
+import functools
+import html
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+import pytest
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+DEFAULT_TRACE = "report/timing_trace.json"
+
+
+class Tracer:
+    """
+    Records nested timing spans. Each thread keeps its own stack, so spans opened
+    by background workers become roots of their own. Finished spans are kept for
+    the trace file and buffered until the test hooks drain them.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.spans = []
+        self.test = None
+        self._pending = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        path = f"{stack[-1]};{name}" if stack else name
+        stack.append(path)
+        started, wall = time.perf_counter(), time.time()
+        try:
+            yield
+        finally:
+            stack.pop()
+            record = {
+                "name": name,
+                "path": path,
+                "test": self.test,
+                "start": wall,
+                "duration": time.perf_counter() - started,
+                "thread": threading.get_ident(),
+            }
+            with self._lock:
+                self.spans.append(record)
+                self._pending.append(record)
+
+    def drain(self):
+        """Return and forget the spans finished since the last drain"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        return pending
+
+    def write_trace(self, path):
+        """Export every span in the Chrome trace event format (chrome://tracing, Perfetto)"""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span["name"],
+                "cat": span["path"].split(";", 1)[0],
+                "ph": "X",
+                "ts": round(span["start"] * 1e6),
+                "dur": round(span["duration"] * 1e6),
+                "pid": pid,
+                "tid": span["thread"],
+                "args": {"test": span["test"], "path": span["path"]},
+            }
+            for span in self.spans
+        ]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+_tracer = Tracer(enabled=False)
+
+
+def configure_tracer(**options):
+    global _tracer
+    _tracer = Tracer(**options)
+    return _tracer
+
+
+def span(name):
+    """Time a block as a span of the current test"""
+    return _tracer.span(name)
+
+
+def timed(name=None):
+    """Decorator recording every call of a function as a span"""
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def condition_name(method):
+    """Readable name of an expected condition, e.g. element_to_be_clickable"""
+    qualname = getattr(method, "__qualname__", type(method).__name__)
+    return qualname.split(".<locals>", 1)[0]
+
+
+def instrument_waits():
+    """Record every WebDriverWait.until / until_not as a span named after its condition"""
+    for attr in ("until", "until_not"):
+        original = getattr(WebDriverWait, attr)
+        if getattr(original, "traced", False):
+            continue
+
+        def wrapper(self, method, message="", _original=original):
+            with _tracer.span(f"wait:{condition_name(method)}"):
+                return _original(self, method, message)
+        wrapper.traced = True
+        functools.update_wrapper(wrapper, original)
+        setattr(WebDriverWait, attr, wrapper)
+
+
+def self_times(spans):
+    """Seconds spent in each span path excluding its children"""
+    totals = defaultdict(float)
+    for span in spans:
+        totals[span["path"]] += span["duration"]
+    own = dict(totals)
+    for path, total in totals.items():
+        if ";" in path:
+            parent = path.rsplit(";", 1)[0]
+            if parent in own:
+                own[parent] -= total
+    return own
+
+
+def breakdown(spans, limit=4):
+    """Phase totals followed by the slowest steps, for one row of the report"""
+    phases = defaultdict(float)
+    steps = defaultdict(float)
+    for span in spans:
+        if ";" not in span["path"]:
+            phases[span["name"]] += span["duration"]
+    for path, seconds in self_times(spans).items():
+        if ";" in path:
+            steps[path.rsplit(";", 1)[1]] += seconds
+    parts = [f"{phase} {seconds:.2f}s" for phase, seconds in phases.items()]
+    slowest = sorted(((name, seconds) for name, seconds in steps.items() if seconds >= 0.005),
+                     key=lambda item: item[1], reverse=True)[:limit]
+    if slowest:
+        parts.append(", ".join(f"{name} {seconds:.2f}s" for name, seconds in slowest))
+    return " | ".join(parts)
+
+
+def flame_summary(totals, counts, min_share=0.005, limit=60):
+    """Indented, bar-annotated tree of aggregated span paths as an HTML table"""
+    children = defaultdict(list)
+    for path in totals:
+        children[path.rsplit(";", 1)[0] if ";" in path else None].append(path)
+    grand_total = sum(totals[path] for path in children[None]) or 1.0
+
+    rows = []
+
+    def visit(path, depth):
+        if len(rows) >= limit or totals[path] / grand_total < min_share:
+            return
+        share = totals[path] / grand_total
+        name = html.escape(path.rsplit(";", 1)[-1])
+        rows.append(
+            f"<tr><td style='padding-left:{depth * 16 + 4}px'>{name}</td>"
+            f"<td>{totals[path]:.2f}s</td><td>{counts[path]}</td>"
+            f"<td style='width:40%'><div style='background:#e67e22;height:10px;width:{share:.1%}'></div></td></tr>"
+        )
+        for child in sorted(children[path], key=totals.get, reverse=True):
+            visit(child, depth + 1)
+
+    for root in sorted(children[None], key=totals.get, reverse=True):
+        visit(root, 0)
+    return (
+        "<h2>Time breakdown</h2><table><tr><th>Step</th><th>Total</th><th>Calls</th><th>Share</th></tr>"
+        + "".join(rows) + "</table>"
+    )
+
+
+class TimingPlugin:
+    """
+    Wraps every test phase and fixture setup in spans, attaches the spans to the
+    reports, adds a timing column and a flame-style summary to the HTML report and
+    writes a trace file at the end of the session.
+    """
+
+    def __init__(self, tracer, trace_path=DEFAULT_TRACE):
+        self.tracer = tracer
+        self.trace_path = trace_path
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        self.tracer.test = item.nodeid
+        with self.tracer.span("setup"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        with self.tracer.span("call"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item):
+        with self.tracer.span("teardown"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        with self.tracer.span(f"fixture:{fixturedef.argname}"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        report = outcome.get_result()
+        spans = self.tracer.drain()
+        # The call row of the HTML report shows setup and call together
+        if call.when == "setup":
+            item.setup_spans = spans
+        report.spans = getattr(item, "setup_spans", []) + spans if call.when == "call" else spans
+        if call.when == "teardown":
+            self.tracer.test = None
+
+    def pytest_runtest_logreport(self, report):
+        if report.when == "setup" and report.passed:
+            return  # counted with the call report
+        for span in getattr(report, "spans", ()):
+            self.totals[span["path"]] += span["duration"]
+            self.counts[span["path"]] += 1
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_html_results_table_header(self, cells):
+        cells.insert(3, "<th>Timing</th>")
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_html_results_table_row(self, report, cells):
+        cells.insert(3, "<td>{}</td>".format(html.escape(breakdown(getattr(report, "spans", [])))))
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_html_results_summary(self, prefix, summary, postfix, session):
+        if self.totals:
+            postfix.append(flame_summary(self.totals, self.counts))
+
+    def pytest_sessionfinish(self, session):
+        if self.trace_path and self.tracer.spans:
+            worker = os.environ.get("PYTEST_XDIST_WORKER")
+            path = self.trace_path
+            if worker:
+                root, ext = os.path.splitext(path)
+                path = f"{root}.{worker}{ext}"
+            self.tracer.write_trace(path)
@@ -0,0 +1,330 @@
+import argparse
+import fnmatch
+import html
+import json
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+
+
+DEFAULT_BASELINES = "data/visual-baselines"
+DEFAULT_MASKS = "data/visual-masks.json"
+DEFAULT_DIFFS = "report/visual-diffs"
+TIMESTAMP = re.compile(r"_\d{8}_\d{6}(_\d+)?$")
+
+# SSIM constants for 8-bit images (Wang et al. 2004)
+C1 = (0.01 * 255) ** 2
+C2 = (0.03 * 255) ** 2
+
+
+def baseline_name(path):
+    """Test name of a screenshot file: its name without the timestamp suffix"""
+    return TIMESTAMP.sub("", os.path.splitext(os.path.basename(path))[0])
+
+
+def load_masks(path=DEFAULT_MASKS):
+    """Mask config: {name pattern: {"rects": [[x, y, w, h], ...], "selectors": [css or locator key, ...]}}"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def masks_for(config, name):
+    """Rects and selectors of every pattern matching a screenshot name"""
+    rects, selectors = [], []
+    for pattern, entry in config.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            rects.extend(entry.get("rects", []))
+            selectors.extend(entry.get("selectors", []))
+    return rects, selectors
+
+
+MASK_RECTS_JS = """
+const ratio = window.devicePixelRatio || 1;
+return arguments[0].flatMap(selector => Array.from(document.querySelectorAll(selector)).map(el => {
+    const r = el.getBoundingClientRect();
+    return [r.left * ratio, r.top * ratio, r.width * ratio, r.height * ratio].map(Math.round);
+}));
+"""
+
+
+def resolve_selectors(driver, selectors, locators):
+    """Screenshot-pixel rects of the elements matched by CSS selectors or "section.key" locator names"""
+    css = []
+    for selector in selectors:
+        section, _, key = selector.partition(".")
+        css.append(locators.get(section, {}).get(key, selector) if key else selector)
+    return driver.execute_script(MASK_RECTS_JS, css) if css else []
+
+
+def mask_array(shape, rects):
+    mask = np.zeros(shape, dtype=bool)
+    for x, y, w, h in rects:
+        mask[max(0, y):max(0, y + h), max(0, x):max(0, x + w)] = True
+    return mask
+
+
+def load_gray(path, mask=None):
+    gray = np.asarray(Image.open(path).convert("L"), dtype=np.float64)
+    if mask is not None:
+        gray = np.where(mask, 0.0, gray)
+    return gray
+
+
+def _dct_matrix(n):
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def phash(gray, size=16):
+    """
+    DCT perceptual hash with size*size bits, as hex. The default 256-bit hash
+    still reacts to small text changes that an 8x8 hash would smooth away.
+    """
+    n = size * 4
+    small = np.asarray(Image.fromarray(gray.astype(np.uint8)).resize((n, n), Image.BILINEAR), dtype=np.float64)
+    dct = _dct_matrix(n)
+    low = (dct @ small @ dct.T)[:size, :size].ravel()
+    bits = low > np.median(low[1:])
+    return np.packbits(bits).tobytes().hex()
+
+
+def hamming(a, b):
+    return int(np.unpackbits(np.frombuffer(bytes.fromhex(a), np.uint8)
+                             ^ np.frombuffer(bytes.fromhex(b), np.uint8)).sum())
+
+
+def _box_mean(x, k):
+    """Mean of every k*k window ("valid" positions) from an integral image"""
+    s = np.pad(x, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    return (s[k:, k:] - s[:-k, k:] - s[k:, :-k] + s[:-k, :-k]) / (k * k)
+
+
+def ssim(a, b, mask=None, window=7):
+    """Mean structural similarity over the windows not entirely masked out"""
+    mu_a, mu_b = _box_mean(a, window), _box_mean(b, window)
+    var_a = _box_mean(a * a, window) - mu_a ** 2
+    var_b = _box_mean(b * b, window) - mu_b ** 2
+    cov = _box_mean(a * b, window) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + C1) * (2 * cov + C2)) / ((mu_a ** 2 + mu_b ** 2 + C1) * (var_a + var_b + C2))
+    if mask is not None:
+        visible = _box_mean(mask.astype(np.float64), window) < 1.0
+        return float(ssim_map[visible].mean()) if visible.any() else 1.0
+    return float(ssim_map.mean())
+
+
+def write_diff(current_path, changed, mask, path):
+    """Current screenshot with changed pixels in red and masked areas greyed out"""
+    image = np.asarray(Image.open(current_path).convert("RGB")).copy()
+    image[mask] = image[mask] // 3 + 140
+    image[changed] = (255, 0, 0)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.fromarray(image).save(path, optimize=False, compress_level=1)
+
+
+def _sidecar(baselines, name):
+    return os.path.join(baselines, f"{name}.json")
+
+
+def read_baseline(baselines, name):
+    """(png path, {"phash", "rects", "size"}) of a baseline, or (None, None)"""
+    image = os.path.join(baselines, f"{name}.png")
+    if not os.path.exists(image):
+        return None, None
+    with open(_sidecar(baselines, name), encoding="utf-8") as f:
+        return image, json.load(f)
+
+
+def write_baseline(baselines, name, source, rects):
+    """Store a screenshot as the baseline of its name, with its hash and capture-time masks"""
+    os.makedirs(baselines, exist_ok=True)
+    image = os.path.join(baselines, f"{name}.png")
+    shutil.copyfile(source, image)
+    with Image.open(image) as img:
+        width, height = img.size
+    gray = load_gray(image, mask_array((height, width), rects))
+    meta = {"phash": phash(gray), "rects": rects, "size": [width, height]}
+    with open(_sidecar(baselines, name), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def compare(job):
+    """
+    Compare one screenshot with its baseline. The perceptual hashes of the two
+    masked images are checked first; only on a mismatch are the pixels diffed
+    (SSIM plus the share of changed pixels) and a diff image written.
+    """
+    name, path, baseline, meta, rects, options = job
+    result = {"name": name, "screenshot": path, "baseline": baseline, "diff": None,
+              "distance": None, "ssim": None, "changed": None}
+    with Image.open(path) as img:
+        width, height = img.size
+    if [width, height] != meta["size"]:
+        return dict(result, status="changed", method="size",
+                    reason=f"{width}x{height} vs baseline {meta['size'][0]}x{meta['size'][1]}")
+
+    # The stored hash of the baseline holds as long as the screenshot adds no new masks
+    extra = [rect for rect in rects if rect not in meta["rects"]]
+    mask = mask_array((height, width), meta["rects"] + extra)
+    current = load_gray(path, mask)
+    reference = phash(load_gray(baseline, mask)) if extra else meta["phash"]
+    result["distance"] = hamming(phash(current), reference)
+    if result["distance"] <= options["hash_distance"]:
+        return dict(result, status="match", method="hash")
+
+    previous = load_gray(baseline, mask)
+    changed = (np.abs(current - previous) > options["pixel_tolerance"]) & ~mask
+    result["ssim"] = round(ssim(current, previous, mask if mask.any() else None), 4)
+    result["changed"] = round(float(changed.mean()), 5)
+    # The mean SSIM of a full page hides a changed word, so the changed pixel count decides as well
+    if result["ssim"] >= options["ssim_threshold"] and changed.sum() <= options["max_changed_pixels"]:
+        return dict(result, status="match", method="ssim")
+    result["diff"] = os.path.join(options["diffs"], f"{name}.diff.png")
+    write_diff(path, changed, mask, result["diff"])
+    return dict(result, status="changed", method="ssim")
+
+
+class VisualChecker:
+    """
+    Collects the screenshots of a run and compares them with the baselines per
+    test name at the end, spread over a process pool. Screenshots without a
+    baseline (or all of them with `update`) become the new baselines.
+    """
+
+    def __init__(self, baselines=DEFAULT_BASELINES, masks=DEFAULT_MASKS, diffs=DEFAULT_DIFFS,
+                 enabled=True, update=False, hash_distance=0, ssim_threshold=0.98,
+                 max_changed_pixels=100, pixel_tolerance=16, workers=None):
+        self.baselines = baselines
+        self.masks = load_masks(masks)
+        self.enabled = enabled
+        self.update = update
+        self.workers = workers or os.cpu_count() or 1
+        self.options = {
+            "diffs": diffs,
+            "hash_distance": hash_distance,
+            "ssim_threshold": ssim_threshold,
+            "max_changed_pixels": max_changed_pixels,
+            "pixel_tolerance": pixel_tolerance,
+        }
+        self.results = []
+        self._shots = []
+        self._lock = threading.Lock()
+
+    def record_masks(self, driver, name, locators):
+        """Resolve the selector masks of a screenshot while its page is still shown"""
+        selectors = masks_for(self.masks, name)[1] if self.enabled else []
+        return resolve_selectors(driver, selectors, locators) if selectors else []
+
+    def add(self, name, path, rects=()):
+        if self.enabled and path:
+            with self._lock:
+                self._shots.append((name, path, list(rects)))
+
+    def run(self):
+        """Compare every collected screenshot; returns the results"""
+        with self._lock:
+            shots, self._shots = self._shots, []
+        results, jobs, seen, written = [], [], set(), set()
+        for name, path, rects in shots:
+            if (path, name) in seen or not os.path.exists(path):
+                continue
+            seen.add((path, name))
+            rects = masks_for(self.masks, name)[0] + rects
+            baseline, meta = read_baseline(self.baselines, name)
+            if baseline is None or (self.update and name not in written):
+                write_baseline(self.baselines, name, path, rects)
+                written.add(name)
+                results.append({"name": name, "screenshot": path, "status": "new" if baseline is None else "updated",
+                                "method": None, "diff": None, "distance": None, "ssim": None, "changed": None})
+                continue
+            jobs.append((name, path, baseline, meta, rects, self.options))
+
+        if len(jobs) > 1 and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                results.extend(pool.map(compare, jobs))
+        else:
+            results.extend(map(compare, jobs))
+        self.results.extend(results)
+        return results
+
+    @property
+    def changed(self):
+        return [r for r in self.results if r["status"] == "changed"]
+
+    def report(self):
+        counts = {}
+        for result in self.results:
+            key = result["status"] if result["status"] != "match" else f"match ({result['method']})"
+            counts[key] = counts.get(key, 0) + 1
+        parts = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        return f"Visual regression: {len(self.results)} screenshots, {parts or 'nothing compared'}"
+
+    def html_summary(self, report_dir="."):
+        """Table of every comparison for the HTML report, changed screenshots first with their diff image"""
+        def link(path):
+            if not path:
+                return ""
+            href = html.escape(os.path.relpath(path, report_dir))
+            return f"<a href='{href}'><img src='{href}' style='max-width:240px'></a>"
+
+        def cell(value, spec=""):
+            return "" if value is None else format(value, spec)
+
+        ordered = sorted(self.results, key=lambda r: (r["status"] != "changed", r["name"]))
+        rows = "".join(
+            f"<tr><td>{html.escape(r['name'])}</td><td>{r['status']}</td><td>{cell(r['method'])}</td>"
+            f"<td>{cell(r['distance'])}</td><td>{cell(r['ssim'])}</td><td>{cell(r['changed'], '.3%')}</td>"
+            f"<td>{link(r['diff'])}</td></tr>"
+            for r in ordered
+        )
+        return ("<h2>Visual regression</h2><table><tr><th>Screenshot</th><th>Status</th><th>Check</th>"
+                "<th>Hash distance</th><th>SSIM</th><th>Changed pixels</th><th>Diff</th></tr>" + rows + "</table>")
+
+
+_checker = VisualChecker(enabled=False)
+
+
+def configure_visual(**options):
+    global _checker
+    _checker = VisualChecker(**options)
+    return _checker
+
+
+def get_visual_checker():
+    return _checker
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a folder of screenshots with the visual baselines")
+    parser.add_argument("folder", nargs="?", default="screenshots")
+    parser.add_argument("--baselines", default=DEFAULT_BASELINES)
+    parser.add_argument("--masks", default=DEFAULT_MASKS)
+    parser.add_argument("--diffs", default=DEFAULT_DIFFS)
+    parser.add_argument("--update", action="store_true", help="Replace the baselines with these screenshots")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    checker = VisualChecker(args.baselines, args.masks, args.diffs, update=args.update, workers=args.workers)
+    latest = {}
+    for entry in sorted(os.listdir(args.folder)):
+        if entry.endswith(".png"):
+            latest[baseline_name(entry)] = os.path.join(args.folder, entry)  # timestamps sort, keep the newest
+    for name, path in latest.items():
+        checker.add(name, path)
+    for result in checker.run():
+        detail = f" ssim {result['ssim']} changed {result['changed']:.3%} -> {result['diff']}" if result["diff"] else ""
+        print(f"{result['status']:<8} {result['name']}{detail}")
+    print(checker.report())
+    return 1 if checker.changed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+import json
+import threading
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import WebDriverException
+from utils.driver_pool import accept_disclaimer, wait_for_chat_ready
+from utils.timing import span, timed
+
+
+READ_STORAGE_JS = """
+function dump(storage) {
+    var items = {};
+    for (var i = 0; i < storage.length; i++) {
+        var key = storage.key(i);
+        items[key] = storage.getItem(key);
+    }
+    return items;
+}
+return {origin: window.location.origin, local: dump(window.localStorage), session: dump(window.sessionStorage)};
+"""
+
+# Runs before any page script on every new document of the snapshot's origin
+RESTORE_STORAGE_JS = """
+(function (snapshot) {
+    if (window.location.origin !== snapshot.origin) return;
+    Object.keys(snapshot.local).forEach(function (key) { window.localStorage.setItem(key, snapshot.local[key]); });
+    Object.keys(snapshot.session).forEach(function (key) { window.sessionStorage.setItem(key, snapshot.session[key]); });
+})(%s);
+"""
+
+
+class ProfileSnapshot:
+    """Cookies and web storage of a session that already passed the bootstrap"""
+
+    def __init__(self, lang, origin, cookies, local_storage, session_storage):
+        self.lang = lang
+        self.origin = origin
+        self.cookies = cookies
+        self.local_storage = local_storage
+        self.session_storage = session_storage
+
+
+def _cdp_cookie(cookie, origin):
+    converted = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly") if key in cookie}
+    if "expiry" in cookie:
+        converted["expires"] = cookie["expiry"]
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        converted["sameSite"] = cookie["sameSite"]
+    if "domain" not in converted:
+        converted["url"] = origin
+    return converted
+
+
+class WarmStart:
+    """
+    Runs the disclaimer/language bootstrap once per language, snapshots cookies,
+    localStorage and sessionStorage, and injects them into later sessions before
+    their first navigation so they land directly on a ready chat input. A
+    snapshot is dropped and retaken as soon as the disclaimer shows up again.
+    """
+
+    def __init__(self, site_url, locators):
+        self.site_url = site_url
+        self.locators = locators
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self.stats = {"bootstraps": 0, "warm_starts": 0, "invalidated": 0}
+
+    def language_url(self, lang):
+        return self.site_url + lang + "/"
+
+    def invalidate(self, lang=None):
+        with self._lock:
+            if lang is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(lang, None)
+
+    def capture(self, driver, lang):
+        storage = driver.execute_script(READ_STORAGE_JS)
+        snapshot = ProfileSnapshot(lang, storage["origin"], driver.get_cookies(), storage["local"], storage["session"])
+        with self._lock:
+            self._snapshots[lang] = snapshot
+        return snapshot
+
+    def _apply(self, driver, snapshot):
+        """Inject the snapshot so it is in place for the next navigation"""
+        previous = getattr(driver, "_warm_start_script", None)
+        if previous:
+            driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument", {"identifier": previous})
+        payload = json.dumps({"origin": snapshot.origin, "local": snapshot.local_storage,
+                              "session": snapshot.session_storage})
+        result = driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                                        {"source": RESTORE_STORAGE_JS % payload})
+        driver._warm_start_script = result["identifier"]
+        driver.execute_cdp_cmd("Network.setCookies",
+                               {"cookies": [_cdp_cookie(c, snapshot.origin) for c in snapshot.cookies]})
+
+    def _bootstrap(self, driver, lang):
+        with span("page load"):
+            driver.get(self.language_url(lang))
+        accept_disclaimer(driver, self.locators)
+        input_box = wait_for_chat_ready(driver, self.locators)
+        self.capture(driver, lang)
+        with self._lock:
+            self.stats["bootstraps"] += 1
+        return input_box
+
+    def _disclaimer_shown(self, driver):
+        buttons = driver.find_elements(By.CSS_SELECTOR, self.locators["home_page"]["accept_button"])
+        return any(button.is_displayed() for button in buttons)
+
+    @timed("warm start")
+    def open(self, driver, lang="en"):
+        """Navigate to the language root with a ready chat input and return the input element"""
+        with self._lock:
+            snapshot = self._snapshots.get(lang)
+        if snapshot is None:
+            return self._bootstrap(driver, lang)
+
+        try:
+            self._apply(driver, snapshot)
+        except (AttributeError, WebDriverException):
+            # No CDP available, fall back to the regular bootstrap
+            return self._bootstrap(driver, lang)
+
+        with span("page load"):
+            driver.get(self.language_url(lang))
+        input_box = wait_for_chat_ready(driver, self.locators)
+        if self._disclaimer_shown(driver):
+            with self._lock:
+                self.stats["invalidated"] += 1
+            self.invalidate(lang)
+            accept_disclaimer(driver, self.locators)
+            self.capture(driver, lang)
+            return input_box
+
+        with self._lock:
+            self.stats["warm_starts"] += 1
+        return input_box